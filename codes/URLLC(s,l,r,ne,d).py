@@ -1,5 +1,10 @@
-import random
-import time
+import math
+from sim_clock import SimClock
+from headless import run_options
+from trace_writer import TraceWriter, open_trace
+from channel_model import urllc_channel
+from streaming_stats import METRICS
+from phase_profiler import PROFILER
 
 class Vehicle:
     def __init__(self, id, position, speed):
@@ -11,47 +16,75 @@ class Vehicle:
         # Update vehicle position based on speed and time
         self.position += self.speed * delta_time
     
-    def communicate(self, other_vehicle):
-        # Simulate URLLC communication with another vehicle
-        distance = abs(self.position - other_vehicle.position)
-        latency = random.uniform(0.001, 0.005)  # Simulate URLLC latency in seconds
-        reliability = random.uniform(0.999, 1.0)  # Simulate reliability close to 100%
-        return distance, latency, reliability
+    def distance_to(self, other_vehicle):
+        return abs(self.position - other_vehicle.position)
 
 
 class Platoon:
-    def __init__(self, vehicles):
+    def __init__(self, vehicles, trace=None, channel=None, metrics=METRICS):
         self.vehicles = vehicles
+        self.metrics = metrics  # Streaming link metrics under "urllc"; None to skip them
+        self.channel = channel if channel is not None else urllc_channel()  # Path loss decides each link
         self.total_communications = 0  # Total number of communication attempts
         self.successful_communications = 0  # Total successful communications
+        self.trace = trace if trace is not None else TraceWriter()  # Silent unless a trace is given
+        self.step = 0
+        self.time = 0.0
 
     def update(self, delta_time):
         # Update the positions of all vehicles in the platoon
-        for i, vehicle in enumerate(self.vehicles):
+        for vehicle in self.vehicles:
             vehicle.update_position(delta_time)
-            if i > 0:  # All vehicles except the leader communicate with the vehicle ahead
-                distance, latency, reliability = vehicle.communicate(self.vehicles[i - 1])
-                
-                # Increment total communications
-                self.total_communications += 1
+        self.communicate(delta_time)
 
-                # Get the vehicle ahead
-                vehicle_ahead = self.vehicles[i - 1]
+    def communicate(self, delta_time):
+        """One step of link exchanges at the vehicles' current positions (a mobility trace replay sets them instead of update)."""
+        trace = self.trace
+        sampled = trace.sample(self.step)
+        self.time += delta_time
 
+        # All vehicles except the leader communicate with the vehicle ahead: one channel batch for every link
+        vehicles = self.vehicles
+        distances = [vehicles[i].distance_to(vehicles[i - 1]) for i in range(1, len(vehicles))]
+        latencies, reliabilities, successes = self.channel.sample(distances)
+        links = zip(distances, latencies.tolist(), reliabilities.tolist(), successes.tolist())
+
+        for i, vehicle in enumerate(vehicles):
+            if i == 0:  # The leader only moves
+                trace.record(self.step, vehicle.id, vehicle.position, 0, vehicle.speed, math.nan, math.nan, math.nan)
+                continue
+            distance, latency, reliability, success = next(links)
+
+            # Increment total communications
+            self.total_communications += 1
+
+            # Get the vehicle ahead
+            vehicle_ahead = self.vehicles[i - 1]
+
+            if self.metrics is not None:
+                link = (vehicle.id, vehicle_ahead.id)
+                self.metrics.record("urllc", "latency", latency, self.time, vehicle=vehicle.id, link=link)
+                self.metrics.record("urllc", "reliability", reliability, vehicle=vehicle.id, link=link, quantiles=False)
+                self.metrics.record("urllc", "delivery", float(success), vehicle=vehicle.id, link=link, quantiles=False)
+
+            trace.record(self.step, vehicle.id, vehicle.position, 0, vehicle.speed, latency, reliability,
+                         self.calculate_efficiency(), distance)
+            if sampled:
                 print(f"Vehicle {vehicle.id} (Speed: {vehicle.speed:.2f} m/s) communicating with Vehicle {vehicle_ahead.id} (Speed: {vehicle_ahead.speed:.2f} m/s):")
                 print(f"  Distance: {distance:.2f} meters")
                 print(f"  Latency: {latency:.4f} seconds")
                 print(f"  Reliability: {reliability:.4f}")
 
-                # Adjust speed based on the distance to the vehicle ahead
-                if distance < 10:  # If too close, slow down
-                    vehicle.speed -= 0.5
-                elif distance > 20:  # If too far, speed up
-                    vehicle.speed += 0.5
-                
-                # Simulate success based on reliability
-                if random.random() <= reliability:  # Communication successful
-                    self.successful_communications += 1
+            # Adjust speed based on the distance to the vehicle ahead
+            if distance < 10:  # If too close, slow down
+                vehicle.speed -= 0.5
+            elif distance > 20:  # If too far, speed up
+                vehicle.speed += 0.5
+            
+            # Success was drawn by the channel from the link's reliability
+            if success:  # Communication successful
+                self.successful_communications += 1
+        self.step += 1
 
     def calculate_efficiency(self):
         # Calculate network efficiency
@@ -62,7 +95,10 @@ class Platoon:
         return efficiency
 
 
-def simulate_platoon():
+def simulate_platoon(real_time_factor=None, trace=None):
+    # Simulated time runs on a virtual clock; pass real_time_factor=1.0 to watch it in real time
+    clock = SimClock(real_time_factor)
+
     # Initialize vehicles with random starting positions and speeds
     vehicles = [
         Vehicle(id=1, position=0, speed=30),  # Leader
@@ -71,18 +107,29 @@ def simulate_platoon():
         Vehicle(id=4, position=45, speed=29)
     ]
 
-    platoon = Platoon(vehicles)
+    platoon = Platoon(vehicles, trace)
     
     # Simulate for 10 seconds with 0.1-second intervals
     for t in range(100):
         delta_time = 0.1  # time step in seconds
-        platoon.update(delta_time)
-        time.sleep(delta_time)  # Simulate real-time behavior
+        with PROFILER.phase("update"):
+            platoon.update(delta_time)
+        clock.advance(delta_time)  # Advance simulated time without blocking
 
         # Print network efficiency every second (after 10 iterations)
         if t % 10 == 0:  # Print every 10 iterations (1 second)
             efficiency = platoon.calculate_efficiency()
             print(f"Network Efficiency: {efficiency:.2f}% (Total Communications: {platoon.total_communications}, Successful Communications: {platoon.successful_communications})")
 
-# Call the simulation function to run the simulation
-simulate_platoon()
+    latency = METRICS.metric("urllc", "latency").summary(clock.now)
+    if latency["count"]:
+        print(f"Link Latency: mean {latency['mean'] * 1000:.3f} ms, p50 {latency['p50'] * 1000:.3f} ms, "
+              f"p99 {latency['p99'] * 1000:.3f} ms, p99.9 {latency['p99.9'] * 1000:.3f} ms "
+              f"({latency['rate']:.0f} messages/s)")
+
+    platoon.trace.close()
+
+if __name__ == "__main__":
+    # Call the simulation function to run the simulation (--trace FILE records it, --print-every N prints a sample)
+    options = run_options(windowed=False)
+    simulate_platoon(options.real_time_factor, trace=open_trace(options))
@@ -1,7 +1,15 @@
 import pygame
-import time
 import random
 import math
+from headless import run_options, FrameLoop
+from sim_clock import SimClock
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
+
+# Parse --headless/--steps/--seed before the window is opened
+OPTIONS = run_options()
+FRAMES = FrameLoop(OPTIONS)
+CLOCK = SimClock(OPTIONS.real_time_factor)  # Paced to real time only in windowed runs
 
 # Initialize Pygame
 pygame.init()
@@ -42,7 +50,7 @@ class Vehicle:
             self.y = -vehicle_height  # Reset vehicle position to top once it moves out of view
 
     def draw(self):
-        pygame.draw.rect(window, blue, (self.x, self.y, vehicle_width, vehicle_height))
+        return pygame.draw.rect(window, blue, (self.x, self.y, vehicle_width, vehicle_height))
 
     def distance_to(self, other_vehicle):
         """Calculate the distance to another vehicle."""
@@ -61,35 +69,47 @@ class Vehicle:
         print(f"  Network Efficiency: {self.network_efficiency:.2f}")
         
         # Simulate URLLC low-latency and reliable communication
-        time.sleep(0.01)  # Minimal delay to simulate real-time transfer
+        CLOCK.send(0.01)  # Minimal simulated delay for the transfer
 
 # Define the road and vehicles
-def draw_road():
-    window.fill(black)
-    pygame.draw.rect(window, red, (0, 100, width, 10))  # Red line at top
-    pygame.draw.line(window, yellow, (width // 2, 0), (width // 2, height), 5)  # Yellow dashed line
+def draw_road(surface):
+    surface.fill(black)
+    pygame.draw.rect(surface, red, (0, 100, width, 10))  # Red line at top
+    pygame.draw.line(surface, yellow, (width // 2, 0), (width // 2, height), 5)  # Yellow dashed line
+
+RENDERER = LayeredRenderer(window, draw_road)  # The road is drawn once; only the vehicles are redrawn
 
 # URLLC Protocol Simulation
 def urllc_protocol(vehicles):
-    while True:
+    while FRAMES.running():
         # Check for Pygame quit event
-        for event in pygame.event.get():
+        for event in FRAMES.events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
         
         # Update vehicle positions and simulate communication
-        draw_road()
+        if FRAMES.render:
+            with PROFILER.phase("draw"):
+                RENDERER.begin_frame()
         for i in range(len(vehicles)):
-            vehicles[i].move()  # Move each vehicle
-            vehicles[i].draw()  # Draw each vehicle
+            with PROFILER.phase("move"):
+                vehicles[i].move()  # Move each vehicle
+            if FRAMES.render:
+                with PROFILER.phase("draw"):
+                    RENDERER.mark(vehicles[i].draw())  # Draw each vehicle
             
             # Simulate communication with the next vehicle
             if i < len(vehicles) - 1:
-                vehicles[i].communicate(vehicles[i + 1])
+                with PROFILER.phase("communicate"):
+                    vehicles[i].communicate(vehicles[i + 1])
 
-        pygame.display.update()
-        time.sleep(0.05)  # Frame rate control
+        if FRAMES.render:
+            with PROFILER.phase("present"):
+                RENDERER.present()
+        CLOCK.advance(0.05)  # Frame rate control
+        FRAMES.tick()
+    pygame.quit()
 
 if __name__ == "__main__":  # Fixed main guard
     # Initialize vehicles on the road
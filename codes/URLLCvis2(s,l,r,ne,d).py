@@ -1,6 +1,16 @@
 import pygame
 import math
 import random
+from headless import run_options, FrameLoop
+from trace_writer import open_trace
+from road_path import RoadPath, follow_road
+from sprite_cache import SpriteCache
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
+
+# Parse --headless/--steps/--seed before the window is opened
+OPTIONS = run_options()
+FRAMES = FrameLoop(OPTIONS, fps=30)
 
 # Initialize Pygame
 pygame.init()
@@ -16,13 +26,6 @@ GRAY = (50, 50, 50)
 BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 
-# Function to calculate a point on a Bezier curve
-def bezier_point(t, p0, p1, p2, p3):
-    return (
-        (1 - t) ** 3 * p0[0] + 3 * (1 - t) ** 2 * t * p1[0] + 3 * (1 - t) * t ** 2 * p2[0] + t ** 3 * p3[0],
-        (1 - t) ** 3 * p0[1] + 3 * (1 - t) ** 2 * t * p1[1] + 3 * (1 - t) * t ** 2 * p2[1] + t ** 3 * p3[1]
-    )
-
 # Define multiple control points for a winding road with more curves
 control_points_set = [
     [(100, 500), (250, 400), (400, 450), (550, 300)],  # First curve (start from left)
@@ -30,12 +33,11 @@ control_points_set = [
     [(450, 100), (300, 50), (200, 100), (100, 200)],   # Third curve (turn back left)
 ]
 
-# Generate road path points using multiple Bezier curves
-path_points = []
-for control_points in control_points_set:
-    for i in range(101):  # Generate 101 points along each curve
-        t = i / 100
-        path_points.append(bezier_point(t, control_points[0], control_points[1], control_points[2], control_points[3]))
+# Road path sampled from the Bezier curves, parameterized by arc length
+ROAD = RoadPath.from_bezier(control_points_set, samples=100)  # 101 points along each curve
+path_points = ROAD.points()
+
+SPRITES = SpriteCache()  # Rotated vehicle surfaces, reused across frames
 
 # Vehicle class to follow the path
 class Vehicle:
@@ -43,7 +45,7 @@ class Vehicle:
         self.index = index  # Index of the vehicle in the platoon
         self.x, self.y = path_points[0]  # Initial position
         self.speed = 2
-        self.path_index = 0
+        self.s = 0.0  # Distance travelled along the road
         self.angle = 0
         self.width = 30
         self.height = 60
@@ -58,22 +60,9 @@ class Vehicle:
         return self.speed * self.reliability
 
     def follow_path(self):
-        if self.path_index < len(path_points) - 1:
-            # Get current and next point on the path
-            current_point = path_points[self.path_index]
-            next_point = path_points[self.path_index + 1]
-            
-            # Calculate the angle towards the next point
-            self.angle = math.degrees(math.atan2(next_point[1] - current_point[1], next_point[0] - current_point[0]))
-            
-            # Move vehicle towards next point
-            self.x += self.speed * math.cos(math.radians(self.angle))
-            self.y += self.speed * math.sin(math.radians(self.angle))
-            
-            # Check if the vehicle has reached the next point
-            distance_to_next = math.hypot(next_point[0] - self.x, next_point[1] - self.y)
-            if distance_to_next < 10:
-                self.path_index += 1  # Move to next point on the path
+        """Move speed pixels along the road (follow_road moves the whole platoon at once)."""
+        self.s = min(self.s + self.speed, ROAD.length)
+        self.x, self.y, self.angle = ROAD.at(self.s)
 
     def maintain_distance(self, vehicles):
         if self.index > 0:
@@ -85,10 +74,18 @@ class Vehicle:
             else:
                 self.speed = 2  # Normal speed
 
-    def print_info(self, vehicles):  # Corrected method
+    def print_info(self, vehicles, trace, step):  # Corrected method
+        """Record the vehicle in the trace; print it only on steps the console view samples."""
+        distance = math.nan  # The leader has no vehicle ahead
         if self.index > 0:
             vehicle_ahead = vehicles[self.index - 1]
             distance = math.hypot(self.x - vehicle_ahead.x, self.y - vehicle_ahead.y)
+        trace.record(step, self.index, self.x, self.y, self.speed, self.latency,
+                     self.reliability, self.network_efficiency, distance)
+        if not trace.sample(step):
+            return
+
+        if self.index > 0:
             print(f"Vehicle {self.index}: Position ({self.x:.2f}, {self.y:.2f}), Speed: {self.speed}, "
                   f"Distance to next: {distance:.2f}, Latency: {self.latency:.2f} ms, "
                   f"Reliability: {self.reliability:.2f}, Network Efficiency: {self.network_efficiency:.2f}.")
@@ -98,41 +95,55 @@ class Vehicle:
                   f"Network Efficiency: {self.network_efficiency:.2f}.")
 
     def draw(self, screen):
-        rotated_vehicle = pygame.transform.rotate(pygame.Surface((self.width, self.height)), -self.angle)
-        rotated_vehicle.fill(BLUE)
+        rotated_vehicle = SPRITES.rotated(self.width, self.height, -self.angle, BLUE)  # Built once per angle step
         # Adjust the position to center the vehicle after rotation
         rect = rotated_vehicle.get_rect(center=(self.x, self.y))
-        screen.blit(rotated_vehicle, rect.topleft)
+        return screen.blit(rotated_vehicle, rect.topleft)
 
 # Function to draw the road based on path points
-def draw_road():
-    pygame.draw.lines(screen, BLACK, False, path_points, 60)  # Road width
-    pygame.draw.lines(screen, YELLOW, False, path_points, 5)  # Yellow centerline
+def draw_road(surface):
+    surface.fill(GRAY)
+    pygame.draw.lines(surface, BLACK, False, path_points, 60)  # Road width
+    pygame.draw.lines(surface, YELLOW, False, path_points, 5)  # Yellow centerline
 
 # Main function to run the simulation
 def main():
-    clock = pygame.time.Clock()
     vehicles = [Vehicle(i) for i in range(4)]  # Create 4 vehicles
+    trace = open_trace(OPTIONS)  # --trace FILE records every frame, --print-every N prints a sample
+    
+    renderer = LayeredRenderer(screen, draw_road)  # The road is drawn once; only the vehicles are redrawn
     
     running = True
-    while running:
-        for event in pygame.event.get():
+    while running and FRAMES.running():
+        for event in FRAMES.events():
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill(GRAY)
-        draw_road()
-
-        # Update and draw each vehicle
-        for vehicle in vehicles:
-            vehicle.maintain_distance(vehicles)
-            vehicle.follow_path()
-            vehicle.draw(screen)
-            vehicle.print_info(vehicles)  # Print vehicle info to the console
+        if FRAMES.render:
+            with PROFILER.phase("draw"):
+                renderer.begin_frame()
 
-        pygame.display.flip()
-        clock.tick(30)
+        # Adjust speeds to the gaps, then move the whole platoon along the road in one batched call
+        with PROFILER.phase("maintain_distance"):
+            for vehicle in vehicles:
+                vehicle.maintain_distance(vehicles)
+        with PROFILER.phase("move"):
+            follow_road(ROAD, vehicles)
 
+        # Draw each vehicle
+        for vehicle in vehicles:
+            if FRAMES.render:
+                with PROFILER.phase("draw"):
+                    renderer.mark(vehicle.draw(screen))
+            with PROFILER.phase("print_info"):
+                vehicle.print_info(vehicles, trace, FRAMES.frame)  # Record vehicle info (printed when sampled)
+
+        if FRAMES.render:
+            with PROFILER.phase("present"):
+                renderer.present()  # Only the regions the vehicles left and entered
+        FRAMES.tick()
+
+    trace.close()
     pygame.quit()
 
 if __name__ == "__main__":  # Corrected main check
@@ -0,0 +1,73 @@
+import numpy as np
+
+class CSRAdjacency:
+    """Neighbor graph in compressed-sparse-row form.
+
+    The neighbors of node i are indices[offsets[i]:offsets[i + 1]], listed in
+    ascending node order, which is the order the Python double loops add them.
+    """
+
+    def __init__(self, offsets, indices):
+        self.offsets = offsets
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbors(self, i):
+        """Return the neighbor indices of node i."""
+        return self.indices[self.offsets[i]:self.offsets[i + 1]]
+
+    def degree(self, i):
+        """Return the number of neighbors of node i."""
+        return int(self.offsets[i + 1] - self.offsets[i])
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+def build_csr_adjacency(xs, ys, threshold, tile_size=512):
+    """Connect every pair of nodes closer than threshold and return a CSRAdjacency.
+
+    Nodes are sorted by x so each tile of rows only has to be compared with the
+    strip of nodes within threshold of it on the x-axis. Distances are computed
+    in tile_size x tile_size blocks, which keeps memory bounded for any n.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(xs)
+
+    order = np.argsort(xs, kind="stable")
+    sorted_x = xs[order]
+    sorted_y = ys[order]
+
+    rows, cols = [], []
+    for start in range(0, n, tile_size):
+        stop = min(start + tile_size, n)
+        # Only nodes inside the x-strip around this tile can be in range
+        lo = np.searchsorted(sorted_x, sorted_x[start] - threshold, side="left")
+        hi = np.searchsorted(sorted_x, sorted_x[stop - 1] + threshold, side="right")
+        for col_start in range(lo, hi, tile_size):
+            col_stop = min(col_start + tile_size, hi)
+            dx = sorted_x[start:stop, None] - sorted_x[None, col_start:col_stop]
+            dy = sorted_y[start:stop, None] - sorted_y[None, col_start:col_stop]
+            r, c = np.nonzero(np.sqrt(dx * dx + dy * dy) < threshold)
+            r += start
+            c += col_start
+            keep = r != c  # A node is never its own neighbor
+            rows.append(order[r[keep]])
+            cols.append(order[c[keep]])
+
+    if rows:
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+    else:
+        rows = np.empty(0, dtype=np.int64)
+        cols = np.empty(0, dtype=np.int64)
+
+    # Group edges by source node, neighbors in ascending index order
+    edge_order = np.argsort(rows.astype(np.int64) * n + cols, kind="stable")
+    indices = cols[edge_order]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return CSRAdjacency(offsets, indices)
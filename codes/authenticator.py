@@ -0,0 +1,188 @@
+import argparse
+import heapq
+import json
+import random
+from collections import OrderedDict
+import numpy as np
+
+class HandshakeCost:
+    """Latency model of one EAP authentication.
+
+    A full EAP-TLS handshake takes full_rounds round trips to the
+    authentication server and full_compute seconds of server CPU (certificate
+    check and key exchange). Resuming a session from a ticket takes
+    resume_rounds round trips and resume_compute seconds. Round trips overlap
+    freely between requests; server CPU is limited to the authenticator's
+    workers.
+    """
+
+    def __init__(self, round_trip=0.01, full_rounds=5, full_compute=0.008, resume_rounds=2, resume_compute=0.0005):
+        self.round_trip = round_trip
+        self.full_rounds = full_rounds
+        self.full_compute = full_compute
+        self.resume_rounds = resume_rounds
+        self.resume_compute = resume_compute
+
+    def compute(self, resumed):
+        return np.where(resumed, self.resume_compute, self.full_compute)
+
+    def network(self, resumed):
+        return np.where(resumed, self.resume_rounds, self.full_rounds) * self.round_trip
+
+class SessionCache:
+    """Session resumption tickets with a time to live, least recently used evicted above max_entries."""
+
+    def __init__(self, ttl=3600.0, max_entries=100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Key -> (ticket, expiry time)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, now):
+        """The ticket of key if it is still valid at simulated time now, else None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        ticket, expires = entry
+        if expires <= now:
+            del self.entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return ticket
+
+    def put(self, key, ticket, now):
+        self.entries[key] = (ticket, now + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+class AuthResult:
+    def __init__(self, key, success, resumed, latency):
+        self.key = key
+        self.success = success
+        self.resumed = resumed  # Resumed from a session ticket instead of a full handshake
+        self.latency = latency  # Seconds from the request to the server's answer
+
+class Authenticator:
+    """EAP authentication server with session resumption and a pool of workers.
+
+    authenticate_batch takes a burst of join requests at once: ticket lookups
+    happen first, costs and outcomes are drawn as arrays, and the server CPU
+    of each request is scheduled on the earliest free of workers. Workers stay
+    busy across batches, so back-to-back bursts queue behind each other.
+    A handshake succeeds with success_probability; only successful ones get a
+    ticket, and a failed resumption drops the old one.
+    """
+
+    def __init__(self, cost=None, cache=None, workers=8, success_probability=0.99, rng=None):
+        self.cost = cost if cost is not None else HandshakeCost()
+        self.cache = cache if cache is not None else SessionCache()
+        self.free_at = [0.0] * workers  # Heap of the times each worker becomes free
+        self.success_probability = success_probability
+        self.rng = rng  # Seeded from the random module on first use when None
+        self.next_ticket = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start counting requests, handshakes and latencies from zero (tickets and busy workers are kept)."""
+        self.requests = 0
+        self.joins = 0
+        self.latency_total = {False: 0.0, True: 0.0}  # By resumed
+        self.handshakes = {False: 0, True: 0}
+        self.first_request = None
+        self.last_answer = 0.0
+
+    def authenticate(self, key, now=0.0):
+        return self.authenticate_batch([key], now)[0]
+
+    def authenticate_batch(self, keys, now=0.0):
+        """AuthResults, in order, for join requests from every key arriving at simulated time now."""
+        if self.rng is None:
+            self.rng = np.random.default_rng(random.getrandbits(64))
+        resumed = np.array([self.cache.get(key, now) is not None for key in keys], dtype=bool)
+        success = self.rng.random(len(keys)) < self.success_probability
+        answered = self.schedule(now, self.cost.compute(resumed)) + self.cost.network(resumed)
+        latency = answered - now
+
+        results = []
+        for key, ok, was_resumed, lat in zip(keys, success.tolist(), resumed.tolist(), latency.tolist()):
+            if ok:
+                self.cache.put(key, self.next_ticket, now + lat)
+                self.next_ticket += 1
+                self.joins += 1
+            else:
+                self.cache.discard(key)
+            self.handshakes[was_resumed] += 1
+            self.latency_total[was_resumed] += lat
+            results.append(AuthResult(key, ok, was_resumed, lat))
+
+        self.requests += len(keys)
+        if keys:
+            self.first_request = now if self.first_request is None else min(self.first_request, now)
+            self.last_answer = max(self.last_answer, float(answered.max()))
+        return results
+
+    def schedule(self, now, compute):
+        """Times the server CPU of each request is done, taking the earliest free worker in order."""
+        free_at = self.free_at
+        done = np.empty(len(compute))
+        for i, seconds in enumerate(compute.tolist()):
+            finish = max(now, free_at[0]) + seconds
+            heapq.heapreplace(free_at, finish)
+            done[i] = finish
+        return done
+
+    def stats(self):
+        """Handshake counts, mean latency of full and resumed handshakes and joins per second."""
+        busy = self.last_answer - (self.first_request or 0.0)
+        def mean(resumed):
+            return self.latency_total[resumed] / self.handshakes[resumed] if self.handshakes[resumed] else 0.0
+        return {
+            "requests": self.requests,
+            "joins": self.joins,
+            "failures": self.requests - self.joins,
+            "full_handshakes": self.handshakes[False],
+            "resumed_handshakes": self.handshakes[True],
+            "full_latency": mean(False),
+            "resumed_latency": mean(True),
+            "joins_per_second": self.joins / busy if busy > 0 else 0.0,
+        }
+
+def join_burst(vehicles=500, workers=8, bursts=2, interval=60.0, seed=0, **cost):
+    """Authenticate a platoon of vehicles joining at once, then rejoining every interval seconds.
+
+    The first burst runs full handshakes; the later ones resume from the
+    tickets of the first. Returns the stats of every burst.
+    """
+    random.seed(seed)
+    authenticator = Authenticator(HandshakeCost(**cost), workers=workers)
+    report = []
+    for burst in range(bursts):
+        authenticator.reset_stats()
+        authenticator.authenticate_batch(list(range(vehicles)), burst * interval)
+        report.append(authenticator.stats())
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Join bursts against the EAP authenticator")
+    parser.add_argument("--vehicles", type=int, default=500, help="vehicles joining at once")
+    parser.add_argument("--workers", type=int, default=8, help="authentication server workers")
+    parser.add_argument("--bursts", type=int, default=2, help="first burst is full handshakes, the rest resume")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(join_burst(args.vehicles, args.workers, args.bursts, seed=args.seed), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+from script_loader import load_script
+from spatial_index import build_grid
+from routing_engine import BatchRouter
+from perimeter import PlanarGraph
+from road_path import follow_road
+from channel_model import PathLossChannel
+from authenticator import Authenticator
+from packet_engine import PacketNetwork
+from platoon_engine import PlatoonArrays
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+DEFAULT_BUDGET = 10.0  # Seconds one measurement may take before larger sizes are skipped
+MIN_FIT_SECONDS = 1e-4  # Faster timings are mostly timer noise and are left out of the fit
+
+def scattered(n, spacing):
+    """n random positions in a square whose side grows with sqrt(n), so the density stays constant."""
+    side = spacing * math.sqrt(n)
+    return [(random.uniform(0, side), random.uniform(0, side)) for _ in range(n)]
+
+# Each benchmark builds its fixture for n vehicles and returns the operation to time
+
+def bench_update_neighbors(n):
+    """update_neighbors for every vehicle of gpsrvp through the spatial grid."""
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, p, 10) for i, p in enumerate(scattered(n, script.DISTANCE_THRESHOLD))]
+    def run():
+        grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
+    return run
+
+def bench_update_neighbors_scan(n):
+    """update_neighbors for every vehicle of gpsrvp scanning the whole platoon."""
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, p, 10) for i, p in enumerate(scattered(n, script.DISTANCE_THRESHOLD))]
+    def run():
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles)
+    return run
+
+def bench_connect_nodes(n):
+    """connect_nodes of gspr (all pairs)."""
+    script = load_script("gspr(s,l,r,ne,d).py")
+    nodes = [script.Node(x, y, i) for i, (x, y) in enumerate(scattered(n, 150))]
+    def run():
+        for node in nodes:
+            node.neighbors = []
+        script.connect_nodes(nodes, 150)
+    return run
+
+def bench_connect_nodes_csr(n):
+    """connect_nodes_csr of gspr."""
+    script = load_script("gspr(s,l,r,ne,d).py")
+    nodes = [script.Node(x, y, i) for i, (x, y) in enumerate(scattered(n, 150))]
+    return lambda: script.connect_nodes_csr(nodes, 150)
+
+def bench_find_farthest_vehicles(n):
+    """find_farthest_vehicles of gpsrvpvis."""
+    script = load_script("gpsrvpvis(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, p, 15) for i, p in enumerate(scattered(n, script.DISTANCE_THRESHOLD))]
+    return lambda: script.find_farthest_vehicles(vehicles)
+
+def bench_grp_route(n):
+    """GRP route of grp along a straight road from the first to the last vehicle (n - 1 hops, printed)."""
+    script = load_script("grp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, i * 8) for i in range(n)]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    with quiet():
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
+    grp = script.GeographicRoutingProtocol()
+    return lambda: grp.route(vehicles[0], vehicles[-1])
+
+def bench_gpsr_route(n):
+    """GPSR route of gspr with perimeter mode between two random nodes (printed)."""
+    script = load_script("gspr(s,l,r,ne,d).py")
+    nodes = [script.Node(x, y, i) for i, (x, y) in enumerate(scattered(n, 100))]
+    adjacency = script.connect_nodes_csr(nodes, 150)
+    planar = PlanarGraph(nodes, 150, adjacency)
+    source, destination = random.sample(nodes, 2)
+    return lambda: script.gpsr_route(source, destination, nodes, planar=planar)
+
+def bench_route_batch(n):
+    """GRP route_batch of grp for n random pairs on a straight road."""
+    script = load_script("grp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, i * 8) for i in range(n)]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    with quiet():
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(n)]
+    return lambda: BatchRouter(vehicles).route_batch(pairs, keep_paths=False)
+
+def bench_platoon_update(n, steps=10):
+    """Platoon.update of URLLC, 10 steps of 0.1 s."""
+    script = load_script("URLLC(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i + 1, i * 15, random.uniform(27, 30)) for i in range(n)]
+    platoon = script.Platoon(vehicles)
+    def run():
+        for _ in range(steps):
+            platoon.update(0.1)
+    return run
+
+def bench_platoon_arrays(n, steps=10):
+    """PlatoonArrays.update of n / 4 platoons of 4 vehicles, 10 steps of 0.1 s."""
+    platoons = max(1, n // 4)
+    positions = np.arange(4) * 15.0 + np.arange(platoons)[:, None] * 1000.0
+    speeds = np.array([[random.uniform(27, 30) for _ in range(4)] for _ in range(platoons)])
+    engine = PlatoonArrays(positions, speeds, seed=random.getrandbits(64))
+    return lambda: engine.run(0.1, steps)
+
+def bench_bezier_follow_path(n, frames=10):
+    """Batched follow_road plus the communicate / adjust_speed loop of urllceap2 for 10 frames, without drawing."""
+    script = load_script("urllceap2(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i) for i in range(n)]
+    def run():
+        for _ in range(frames):
+            follow_road(script.ROAD, vehicles)
+            for vehicle in vehicles:
+                vehicle.communicate(vehicles)
+    return run
+
+def bench_simpy_env_run(n, until=5, scheduler="tick"):
+    """SimPy env.run of grpvpvis for 5 simulated seconds (3 pedestrians per 5 vehicles, 40 m of road per vehicle), one tick process."""
+    script = load_script("grpvpvis(s,l,r,ne,d).py")
+    # The road grows with n so the number of vehicles in communication range stays the same
+    env = script.create_simulation(n, max(1, n * 3 // 5), road_length=40 * n, scheduler=scheduler)
+    return lambda: env.run(until=until)
+
+def bench_simpy_env_run_process(n, until=5):
+    """SimPy env.run of grpvpvis for 5 simulated seconds with one process per vehicle and pedestrian."""
+    return bench_simpy_env_run(n, until, scheduler="process")
+
+def bench_channel_sample(n):
+    """PathLossChannel.sample of n links at random distances up to 300 m in one batch."""
+    channel = PathLossChannel(rng=np.random.default_rng(random.getrandbits(64)))
+    distances = np.array([random.uniform(1, 300) for _ in range(n)])
+    return lambda: channel.sample(distances, 0.5)
+
+def bench_auth_burst(n):
+    """Authenticator.authenticate_batch of n joining vehicles, half of them holding session tickets."""
+    authenticator = Authenticator(rng=np.random.default_rng(random.getrandbits(64)))
+    authenticator.authenticate_batch(list(range(0, n, 2)))
+    return lambda: authenticator.authenticate_batch(list(range(n)), 1.0)
+
+def bench_packet_engine(n, until=1.0):
+    """PacketNetwork.run for 1 simulated second: n gpsrvp vehicles, n / 4 flows of 20 packets/s each."""
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, p, 10) for i, p in enumerate(scattered(n, script.DISTANCE_THRESHOLD))]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    for vehicle in vehicles:
+        vehicle.update_neighbors(vehicles, grid)
+    network = PacketNetwork(vehicles, rng=np.random.default_rng(random.getrandbits(64)))
+    for _ in range(max(1, n // 4)):
+        network.add_flow(*random.sample(range(n), 2), 20.0)
+    return lambda: network.run(until)
+
+# Benchmark name -> fixture builder
+BENCHMARKS = {
+    "update_neighbors": bench_update_neighbors,
+    "update_neighbors_scan": bench_update_neighbors_scan,
+    "connect_nodes": bench_connect_nodes,
+    "connect_nodes_csr": bench_connect_nodes_csr,
+    "find_farthest_vehicles": bench_find_farthest_vehicles,
+    "grp_route": bench_grp_route,
+    "gpsr_route": bench_gpsr_route,
+    "route_batch": bench_route_batch,
+    "platoon_update": bench_platoon_update,
+    "platoon_arrays": bench_platoon_arrays,
+    "bezier_follow_path": bench_bezier_follow_path,
+    "simpy_env_run": bench_simpy_env_run,
+    "simpy_env_run_process": bench_simpy_env_run_process,
+    "channel_sample": bench_channel_sample,
+    "auth_burst": bench_auth_burst,
+    "packet_engine": bench_packet_engine,
+}
+
+# Benchmark name -> vehicle-steps of one timed run at n vehicles, reported as a throughput
+VEHICLE_STEPS = {
+    "platoon_update": lambda n: 10 * n,
+    "platoon_arrays": lambda n: 10 * 4 * max(1, n // 4),
+}
+
+@contextlib.contextmanager
+def quiet():
+    """Discard the scripts' prints (they are still formatted, so their cost is measured)."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def time_once(run):
+    gc.collect()
+    with quiet():
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+
+def fit_exponent(sizes, seconds):
+    """Least-squares slope of log(time) against log(n): time ~ n ** exponent."""
+    points = [(n, t) for n, t in zip(sizes, seconds) if t >= MIN_FIT_SECONDS]
+    if len(points) < 2:
+        return None
+    slope, _ = np.polyfit(np.log([n for n, _ in points]), np.log([t for _, t in points]), 1)
+    return float(slope)
+
+def measure(name, sizes, seed, repeats=3, budget=DEFAULT_BUDGET):
+    """Time one benchmark at every size (best of repeats), skipping sizes predicted to exceed the budget."""
+    build = BENCHMARKS[name]
+    result = {"description": build.__doc__, "sizes": [], "seconds": [], "skipped": []}
+    for n in sorted(sizes):
+        if result["seconds"]:
+            exponent = fit_exponent(result["sizes"], result["seconds"]) or 2.0
+            predicted = result["seconds"][-1] * (n / result["sizes"][-1]) ** max(exponent, 1.0)
+            if predicted > budget:
+                result["skipped"].append(n)
+                continue
+        best = None
+        for _ in range(repeats):
+            random.seed(seed)  # Same fixture for every repeat and every run of the suite
+            with quiet():
+                run = build(n)
+            elapsed = time_once(run)
+            best = elapsed if best is None else min(best, elapsed)
+            if elapsed > budget / repeats:
+                break  # Slow sizes are timed once
+        result["sizes"].append(n)
+        result["seconds"].append(best)
+    result["exponent"] = fit_exponent(result["sizes"], result["seconds"])
+    if name in VEHICLE_STEPS:
+        result["vehicle_steps_per_second"] = [VEHICLE_STEPS[name](n) / t for n, t in zip(result["sizes"], result["seconds"])]
+    return result
+
+def run_suite(names=None, sizes=DEFAULT_SIZES, seed=0, repeats=3, budget=DEFAULT_BUDGET, log=None):
+    """Run the selected benchmarks and return the report as a dict."""
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "seed": seed,
+        "budget": budget,
+        "benchmarks": {},
+    }
+    for name in names or BENCHMARKS:
+        try:
+            result = measure(name, sizes, seed, repeats, budget)
+        except ImportError as error:
+            result = {"error": f"missing dependency: {error}"}  # e.g. pygame or simpy not installed
+        report["benchmarks"][name] = result
+        if log is not None:
+            log(name, result)
+    return report
+
+def compare(report, baseline, tolerance=0.25):
+    """List the measurements of report that are more than tolerance slower than in baseline."""
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name)
+        if not old or "seconds" not in old or "seconds" not in result:
+            continue
+        old_times = dict(zip(old["sizes"], old["seconds"]))
+        for n, seconds in zip(result["sizes"], result["seconds"]):
+            before = old_times.get(n)
+            if before and before >= MIN_FIT_SECONDS and seconds > before * (1 + tolerance):
+                regressions.append({"benchmark": name, "n": n, "before": before, "after": seconds})
+    return regressions
+
+def print_result(name, result):
+    if "error" in result:
+        print(f"{name:24s} {result['error']}", file=sys.stderr)
+        return
+    exponent = result["exponent"]
+    timings = "  ".join(f"n={n}: {t:.4g}s" for n, t in zip(result["sizes"], result["seconds"]))
+    fitted = f"{exponent:.2f}" if exponent is not None else "n/a"
+    throughput = ""
+    if result.get("vehicle_steps_per_second"):
+        throughput = f"  ({result['vehicle_steps_per_second'][-1]:.3g} vehicle-steps/s at n={result['sizes'][-1]})"
+    print(f"{name:24s} exponent {fitted:>5s}  {timings}{throughput}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmarks of the simulation scripts")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="vehicle counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="timings per size (the best one is kept)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="skip sizes predicted to take longer than this many seconds")
+    parser.add_argument("--output", default="benchmark.json", help="JSON report file")
+    parser.add_argument("--baseline", default=None, help="earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    report = run_suite(args.benchmarks, args.sizes, args.seed, args.repeats, args.budget, log=print_result)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"Regression: {r['benchmark']} n={r['n']} {r['before']:.4g}s -> {r['after']:.4g}s", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
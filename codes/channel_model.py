@@ -0,0 +1,123 @@
+import math
+import random
+from abc import ABC, abstractmethod
+import numpy as np
+
+SPEED_OF_LIGHT = 299_792_458.0  # m/s
+
+def q_function(x):
+    """Gaussian tail probability Q(x) = P(N(0, 1) > x), vectorized.
+
+    Uses the Abramowitz-Stegun 7.1.26 approximation of erfc (absolute error
+    below 1.5e-7), since numpy has no erfc of its own.
+    """
+    z = np.abs(np.asarray(x, dtype=float)) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    tail = 0.5 * poly * np.exp(-z * z)
+    return np.where(np.asarray(x) >= 0, tail, 1.0 - tail)
+
+class ChannelModel(ABC):
+    """Base class of the link models.
+
+    sample(distances, load) draws the outcome of a whole batch of links at
+    once: latency in seconds, reliability (success probability) and whether
+    the transmission got through. Subclasses define reliability() and the
+    latency distribution. Without an explicit numpy Generator one is seeded
+    from the random module on first use (after --seed has been applied), so
+    seeded runs stay reproducible.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng
+
+    def reseed(self, seed=None):
+        """Restart the generator, by default from the random module's current state."""
+        self.rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+    @abstractmethod
+    def reliability(self, distances):
+        """Success probability of links of the given lengths."""
+
+    @abstractmethod
+    def latency(self, distances, load=0.0):
+        """Latency draws in seconds for links of the given lengths."""
+
+    def sample(self, distances, load=0.0):
+        """(latency, reliability, success) arrays for links of the given lengths in meters."""
+        if self.rng is None:
+            self.reseed()
+        distances = np.asarray(distances, dtype=float)
+        reliability = self.reliability(distances)
+        success = self.rng.random(distances.shape) < reliability
+        return self.latency(distances, load), reliability, success
+
+    def sample_one(self, distance, load=0.0):
+        """(latency, reliability, success) of a single link as Python scalars."""
+        latency, reliability, success = self.sample(np.array([distance]), load)
+        return float(latency[0]), float(reliability[0]), bool(success[0])
+
+class PathLossChannel(ChannelModel):
+    """Log-distance path loss with log-normal shadowing and a queueing latency.
+
+    The received SNR at distance d is tx_power - PL(d) - noise, with
+    PL(d) = PL(1 m) + 10 * exponent * log10(d) and free-space PL(1 m) at the
+    carrier frequency. Shadowing adds N(0, shadowing_db) dB, so a link gets
+    through with probability Q((snr_threshold - SNR) / shadowing_db).
+    Latency is processing plus propagation delay plus an exponential
+    channel-access wait with mean airtime / (1 - load), where load is the
+    utilization of the shared channel (an M/M/1 queue).
+
+    The defaults are a 5.9 GHz V2X sidelink: 23 dBm transmit power, a
+    10 MHz noise floor and a highway path-loss exponent.
+    """
+
+    def __init__(self, frequency=5.9e9, exponent=2.7, shadowing_db=4.0, tx_power_dbm=23.0, noise_dbm=-95.0,
+                 snr_threshold_db=5.0, processing=0.001, airtime=0.0004, max_load=0.95, rng=None):
+        super().__init__(rng)
+        self.reference_loss = 20 * math.log10(4 * math.pi * frequency / SPEED_OF_LIGHT)  # Free space at 1 m
+        self.exponent = exponent
+        self.shadowing_db = shadowing_db
+        self.tx_power_dbm = tx_power_dbm
+        self.noise_dbm = noise_dbm
+        self.snr_threshold_db = snr_threshold_db
+        self.processing = processing
+        self.airtime = airtime
+        self.max_load = max_load
+
+    def mean_snr(self, distances):
+        """Mean SNR in dB (before shadowing) at the given distances."""
+        d = np.maximum(np.asarray(distances, dtype=float), 1.0)
+        path_loss = self.reference_loss + 10 * self.exponent * np.log10(d)
+        return self.tx_power_dbm - path_loss - self.noise_dbm
+
+    def reliability(self, distances):
+        return q_function((self.snr_threshold_db - self.mean_snr(distances)) / self.shadowing_db)
+
+    def latency(self, distances, load=0.0):
+        distances = np.asarray(distances, dtype=float)
+        utilization = np.minimum(load, self.max_load)
+        wait = self.rng.exponential(1.0, distances.shape) * (self.airtime / (1 - utilization))
+        return self.processing + distances / SPEED_OF_LIGHT + wait
+
+    def utilization(self, links, interval):
+        """Channel load of links transmissions (one airtime each) sharing the channel over interval seconds."""
+        return min(self.max_load, links * self.airtime / interval)
+
+class UniformChannel(ChannelModel):
+    """The old distance-independent model: uniform latency and reliability, kept for comparison runs."""
+
+    def __init__(self, latency=(0.01, 0.1), reliability=(0.5, 1.0), rng=None):
+        super().__init__(rng)
+        self.latency_range = latency
+        self.reliability_range = reliability
+
+    def reliability(self, distances):
+        return self.rng.uniform(*self.reliability_range, np.shape(distances))
+
+    def latency(self, distances, load=0.0):
+        return self.rng.uniform(*self.latency_range, np.shape(distances))
+
+def urllc_channel(rng=None):
+    """Short-range URLLC link: 1 ms processing and short mini-slot transmissions."""
+    return PathLossChannel(processing=0.001, airtime=0.000125, rng=rng)
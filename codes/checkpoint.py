@@ -0,0 +1,130 @@
+import argparse
+import io
+import os
+import pickle
+import struct
+import threading
+
+MAGIC = b"VCKPT1\n"
+
+class CheckpointError(Exception):
+    """A checkpoint file is not a checkpoint, or was written for a different run."""
+
+class StatePickler(pickle.Pickler):
+    """Pickler that stores the objects of external (name -> object) by name only.
+
+    Used for things that cannot or should not be pickled, such as a SimPy
+    environment with its generator processes; they are rebuilt on restore
+    and patched back in by name.
+    """
+
+    def __init__(self, file, external):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.external = {id(obj): name for name, obj in external.items()}
+
+    def persistent_id(self, obj):
+        return self.external.get(id(obj))
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, external):
+        super().__init__(file)
+        self.external = external
+
+    def persistent_load(self, name):
+        if name not in self.external:
+            raise CheckpointError(f"Checkpoint refers to {name!r}, which was not given to restore")
+        return self.external[name]
+
+def dumps(state, external=None):
+    """Serialize state to bytes: a magic header, then the pickle (numpy arrays and random states go in as raw bytes)."""
+    buffer = io.BytesIO()
+    buffer.write(MAGIC)
+    StatePickler(buffer, external or {}).dump(state)
+    return buffer.getvalue()
+
+def loads(data, external=None):
+    if not data.startswith(MAGIC):
+        raise CheckpointError("Not a checkpoint")
+    buffer = io.BytesIO(data)
+    buffer.seek(len(MAGIC))
+    return StateUnpickler(buffer, external or {}).load()
+
+def write_file(path, data):
+    """Write data to path atomically: a crash mid-write leaves the previous checkpoint intact."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(struct.pack("<Q", len(data)))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+def read_file(path):
+    with open(path, "rb") as f:
+        header = f.read(8)
+        data = f.read()
+    if len(header) < 8 or struct.unpack("<Q", header)[0] != len(data):
+        raise CheckpointError(f"Truncated checkpoint {path}")
+    return data
+
+def save(path, state, external=None):
+    write_file(path, dumps(state, external))
+
+def load(path, external=None):
+    return loads(read_file(path), external)
+
+class Checkpointer:
+    """Periodic checkpoints of a running simulation to one file.
+
+    save(state) serializes the state in the caller, which is the consistent
+    snapshot, and hands the bytes to a background thread that writes and
+    fsyncs them, so the simulation does not wait for the disk. A save waits
+    only if the previous write is still running. close() waits for the last
+    write.
+    """
+
+    def __init__(self, path, external=None):
+        self.path = path
+        self.external = external or {}
+        self.thread = None
+        self.error = None
+        self.saves = 0
+
+    def save(self, state):
+        data = dumps(state, self.external)
+        self.wait()
+        self.thread = threading.Thread(target=self.write, args=(data,), daemon=True)
+        self.thread.start()
+        self.saves += 1
+
+    def write(self, data):
+        try:
+            write_file(self.path, data)
+        except Exception as error:  # Raised in the simulation thread by the next wait()
+            self.error = error
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        self.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def checkpoint_options(argv=None):
+    """Parse --checkpoint FILE, --checkpoint-every N and --resume; unknown arguments are ignored."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--checkpoint", default=None, help="save the simulation state to this file periodically")
+    parser.add_argument("--checkpoint-every", type=float, default=10, help="simulated seconds between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="continue from the --checkpoint file if it exists (the --trace file is kept up to the checkpoint and appended to)")
+    options, _ = parser.parse_known_args(argv)
+    return options
@@ -2,6 +2,10 @@ import simpy
 import random
 import pygame
 import sys
+from headless import run_options, FrameLoop
+from spatial_index import RoadIndex
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
 
 # Constants
 VEHICLE_COUNT = 5
@@ -48,14 +52,8 @@ class Vehicle:
 
     def print_distance_to_next_vehicle(self):
         """Print the distance to the nearest vehicle."""
-        distances = []
-        for vehicle in vehicles:
-            if vehicle.name != self.name:  # Exclude self
-                distance = abs(self.position - vehicle.position)
-                distances.append(distance)
-
-        if distances:
-            min_distance = min(distances)
+        min_distance = vehicle_index.at(self.env.now).nearest_distance(self.position, exclude=self)
+        if min_distance is not None:
             print(f"{self.name} distance to next vehicle: {min_distance:.2f} meters.")
 
     def communicate(self):
@@ -77,40 +75,53 @@ class Pedestrian:
             print(f"{self.name} walking to {self.position:.2f} meters at {self.env.now:.2f} seconds.")
             yield self.env.timeout(1)  # Update every second
 
+# Parse --headless/--steps/--seed before anything random happens
+FRAMES = FrameLoop(run_options(), fps=1)
+
 # Initialize Simulation Environment
 env = simpy.Environment()
 vehicles = [Vehicle(env, f"Vehicle-{i}", position=random.randint(0, 200)) for i in range(VEHICLE_COUNT)]
 pedestrians = [Pedestrian(env, f"Pedestrian-{i}", position=random.randint(0, 200)) for i in range(PEDESTRIAN_COUNT)]
+# Sorted positions for the nearest-vehicle queries; within a second each vehicle moves at most once
+vehicle_index = RoadIndex(vehicles, slack=max(v.speed / 3.6 for v in vehicles))
 
 # Pygame Initialization
 pygame.init()
 screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 pygame.display.set_caption("Vehicle and Pedestrian Simulation")
-clock = pygame.time.Clock()
+RENDERER = LayeredRenderer(screen, lambda surface: surface.fill((255, 255, 255)))
 running = True
 
 # Run Simulation with Visualization
 def run_simulation_with_visualization(until):
     for _ in range(until):
-        env.step()  # Step the simulation
-        screen.fill((255, 255, 255))  # Clear screen
-
-        # Draw vehicles
-        for vehicle in vehicles:
-            x = vehicle.position * SCALE  # Scale position for display
-            pygame.draw.rect(screen, (0, 0, 255), (x, WINDOW_HEIGHT // 2, 40, 20))  # Draw vehicle
-
-        # Draw pedestrians
-        for pedestrian in pedestrians:
-            x = pedestrian.position * SCALE  # Scale position for display
-            pygame.draw.circle(screen, (255, 0, 0), (x, WINDOW_HEIGHT // 2 + 40), 10)  # Draw pedestrian
-
-        pygame.display.flip()  # Update the display
-        clock.tick(1)  # 1 frame per second
+        if not FRAMES.running():
+            return
+        with PROFILER.phase("simulation"):
+            env.step()  # Step the simulation
+        if not FRAMES.render:
+            FRAMES.tick()
+            continue
+        with PROFILER.phase("draw"):
+            RENDERER.begin_frame()  # Clear last frame's vehicles and pedestrians
+
+            # Draw vehicles
+            for vehicle in vehicles:
+                x = vehicle.position * SCALE  # Scale position for display
+                RENDERER.mark(pygame.draw.rect(screen, (0, 0, 255), (x, WINDOW_HEIGHT // 2, 40, 20)))  # Draw vehicle
+
+            # Draw pedestrians
+            for pedestrian in pedestrians:
+                x = pedestrian.position * SCALE  # Scale position for display
+                RENDERER.mark(pygame.draw.circle(screen, (255, 0, 0), (x, WINDOW_HEIGHT // 2 + 40), 10))  # Draw pedestrian
+
+        with PROFILER.phase("present"):
+            RENDERER.present()  # Update the changed parts of the display
+        FRAMES.tick()  # 1 frame per second
 
 # Main loop
-while running:
-    for event in pygame.event.get():
+while running and FRAMES.running():
+    for event in FRAMES.events():
         if event.type == pygame.QUIT:
             running = False
 
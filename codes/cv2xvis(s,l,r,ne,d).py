@@ -1,6 +1,9 @@
 import pygame
 import random
 import math
+from headless import run_options, FrameLoop
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
 
 # Constants
 WIDTH, HEIGHT = 800, 600
@@ -8,11 +11,13 @@ VEHICLE_COUNT = 5
 COMMUNICATION_RANGE = 100  # meters
 VEHICLE_SPEED = 2  # Speed of vehicles in pixels per frame
 
+# Parse --headless/--steps/--seed before the window is opened
+FRAMES = FrameLoop(run_options(), fps=30)
+
 # Initialize PyGame
 pygame.init()
 window = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("V2X Traffic Simulation")
-clock = pygame.time.Clock()
 
 # Colors
 BLACK = (0, 0, 0)
@@ -43,7 +48,7 @@ class Vehicle:
             self.y = -self.radius  # Reset to top if out of view
 
     def draw(self):
-        pygame.draw.circle(window, self.color, (int(self.x), int(self.y)), self.radius)
+        return pygame.draw.circle(window, self.color, (int(self.x), int(self.y)), self.radius)
 
     def communicate(self, other):
         distance = math.hypot(other.x - self.x, other.y - self.y)
@@ -69,43 +74,54 @@ def main():
     # Create vehicles at random positions
     vehicles = [Vehicle(random.randint(100, WIDTH - 100), random.randint(0, HEIGHT)) for _ in range(VEHICLE_COUNT)]
 
+    renderer = LayeredRenderer(window, lambda surface: surface.fill(BLACK))
+
     running = True
-    while running:
-        for event in pygame.event.get():
+    while running and FRAMES.running():
+        for event in FRAMES.events():
             if event.type == pygame.QUIT:
                 running = False
 
-        window.fill(BLACK)  # Clear the screen
+        if FRAMES.render:
+            with PROFILER.phase("draw"):
+                renderer.begin_frame()  # Clear where the vehicles were
 
         for i in range(len(vehicles)):
-            vehicles[i].move()  # Move each vehicle
-            vehicles[i].draw()  # Draw each vehicle
+            with PROFILER.phase("move"):
+                vehicles[i].move()  # Move each vehicle
+            if FRAMES.render:
+                with PROFILER.phase("draw"):
+                    renderer.mark(vehicles[i].draw())  # Draw each vehicle
             
             # Check communication with other vehicles
-            for j in range(len(vehicles)):
-                if i != j:
-                    vehicles[i].communicate(vehicles[j])
+            with PROFILER.phase("communicate"):
+                for j in range(len(vehicles)):
+                    if i != j:
+                        vehicles[i].communicate(vehicles[j])
 
             # Calculate distance to the next vehicle and print vehicle statistics
-            if len(vehicles) > 1:
-                # Find the distance to the nearest vehicle
-                distances = [vehicles[i].distance_to(vehicles[j]) for j in range(len(vehicles)) if i != j]
-                if distances:
-                    min_distance = min(distances)
+            with PROFILER.phase("print_info"):
+                if len(vehicles) > 1:
+                    # Find the distance to the nearest vehicle
+                    distances = [vehicles[i].distance_to(vehicles[j]) for j in range(len(vehicles)) if i != j]
+                    if distances:
+                        min_distance = min(distances)
+                        print(f"Vehicle {i + 1}: Speed: {vehicles[i].speed:.2f} px/frame, "
+                              f"Latency: {vehicles[i].latency:.2f} ms, "
+                              f"Reliability: {vehicles[i].reliability:.2f}, "
+                              f"Network Efficiency: {vehicles[i].network_efficiency:.2f}, "
+                              f"Distance to Next Vehicle: {min_distance:.2f} px")
+                else:
                     print(f"Vehicle {i + 1}: Speed: {vehicles[i].speed:.2f} px/frame, "
                           f"Latency: {vehicles[i].latency:.2f} ms, "
                           f"Reliability: {vehicles[i].reliability:.2f}, "
                           f"Network Efficiency: {vehicles[i].network_efficiency:.2f}, "
-                          f"Distance to Next Vehicle: {min_distance:.2f} px")
-            else:
-                print(f"Vehicle {i + 1}: Speed: {vehicles[i].speed:.2f} px/frame, "
-                      f"Latency: {vehicles[i].latency:.2f} ms, "
-                      f"Reliability: {vehicles[i].reliability:.2f}, "
-                      f"Network Efficiency: {vehicles[i].network_efficiency:.2f}, "
-                      f"Distance to Next Vehicle: N/A")
-
-        pygame.display.flip()  # Update the display
-        clock.tick(30)  # Frame rate
+                          f"Distance to Next Vehicle: N/A")
+
+        if FRAMES.render:
+            with PROFILER.phase("present"):
+                renderer.present()  # Update the changed parts of the display
+        FRAMES.tick()  # Frame rate
 
     pygame.quit()
 
@@ -0,0 +1,117 @@
+import heapq
+import math
+import numpy as np
+
+def distance(p, q):
+    """Euclidean distance, computed exactly like Vehicle.distance."""
+    return math.sqrt((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2)
+
+def cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def convex_hull(points):
+    """Convex hull of distinct (x, y) points, counterclockwise, without collinear points (monotone chain)."""
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return points
+    lower, upper = [], []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+def antipodal_pairs(hull):
+    """Candidate diametral pairs of a convex hull by rotating calipers (with the neighbors of each antipode)."""
+    m = len(hull)
+    if m < 2:
+        return []
+    if m == 2:
+        return [(hull[0], hull[1])]
+    pairs = []
+    j = 1
+    for i in range(m):
+        ni = (i + 1) % m
+        while cross(hull[i], hull[ni], hull[(j + 1) % m]) > cross(hull[i], hull[ni], hull[j]):
+            j = (j + 1) % m
+        for a in (i, ni):
+            for b in (j - 1, j, j + 1):  # Neighbors catch parallel edges and rounding ties
+                b %= m
+                if a != b:
+                    pairs.append((hull[a], hull[b]))
+    return pairs
+
+def farthest_pair(points):
+    """Indices (i, j), i <= j, of the two points that are farthest apart, in O(n log n).
+
+    Returns the same pair as comparing every pair in index order and keeping
+    the first strictly larger distance: among equally distant pairs the
+    smallest (i, j) wins, and (0, 0) if all points coincide.
+    """
+    first = {}  # Point -> smallest index at that point
+    for i, p in enumerate(points):
+        first.setdefault(tuple(p), i)
+    best, best_pair = 0, (0, 0)
+    for p, q in antipodal_pairs(convex_hull(first)):
+        d = distance(p, q)
+        pair = tuple(sorted((first[p], first[q])))
+        if d > best or (d == best and d > 0 and pair < best_pair):
+            best, best_pair = d, pair
+    return best_pair
+
+def k_farthest_pairs(points, k, block=1024):
+    """The k farthest pairs (i, j, distance) with i < j, farthest first.
+
+    Any point p can only be in a pair as long as its distance to the farthest
+    hull vertex. Points are taken in order of that bound, and all pairs among
+    the top m are scored in vectorized blocks. m doubles until the next
+    point's bound falls below the k-th best distance, so the answer is exact
+    and the work depends on how many points lie near the outside of the fleet.
+    """
+    xy = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(xy)
+    k = min(k, n * (n - 1) // 2)
+    if k <= 0:
+        return []
+    hull = np.asarray(convex_hull(map(tuple, xy.tolist())), dtype=float)
+    reach = np.zeros(n)  # Distance from each point to its farthest hull vertex
+    for start in range(0, len(hull), block):
+        part = hull[start:start + block]
+        d = np.hypot(xy[:, None, 0] - part[None, :, 0], xy[:, None, 1] - part[None, :, 1])
+        reach = np.maximum(reach, d.max(axis=1))
+    order = np.argsort(-reach, kind="stable")
+
+    m = min(n, max(2 * k, 64))
+    while True:
+        top = best_pairs(xy, np.sort(order[:m]), k, block)
+        kth = top[-1][2] if len(top) == k else 0.0
+        if m == n or reach[order[m]] < kth:
+            return top
+        m = min(n, 2 * m)
+
+def best_pairs(xy, indices, k, block):
+    """The k farthest pairs among the given point indices, scored block by block."""
+    heap = []  # Min-heap of (distance, -i, -j): the k best so far, ties going to the smallest (i, j)
+    pts = xy[indices]
+    for start in range(0, len(indices), block):
+        rows = pts[start:start + block]
+        d = np.hypot(rows[:, None, 0] - pts[None, :, 0], rows[:, None, 1] - pts[None, :, 1])
+        r, c = np.indices(d.shape)
+        d[c <= r + start] = -1.0  # Each unordered pair once
+        flat = d.ravel()
+        take = min(k, flat.size)
+        for f in np.argpartition(-flat, take - 1)[:take]:
+            dist = float(flat[f])
+            if dist < 0:
+                continue
+            i, j = int(indices[start + f // d.shape[1]]), int(indices[f % d.shape[1]])
+            item = (dist, -i, -j)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+    return [(-i, -j, dist) for dist, i, j in sorted(heap, reverse=True)]
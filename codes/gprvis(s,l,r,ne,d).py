@@ -1,12 +1,17 @@
 import pygame
 import random
 import math
+from adjacency import build_csr_adjacency
+from headless import run_options, FrameLoop
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
 
 # Node class
 class Node:
-    def __init__(self, x, y):
+    def __init__(self, x, y, index=None):
         self.x = x
         self.y = y
+        self.index = index  # Position of the node in the node list (used with a CSR adjacency)
         self.neighbors = []
 
     def add_neighbor(self, neighbor):
@@ -38,14 +43,19 @@ def draw_nodes(screen, nodes, packets):
         pygame.draw.line(screen, (255, 0, 0), (int(packet.src.x), int(packet.src.y)), (int(packet.dest.x), int(packet.dest.y)), 2)
 
 # Greedy routing function
-def greedy_routing(src, dest):
+def greedy_routing(src, dest, nodes=None, adjacency=None):
     current = src
     path = [current]
+    visited = {id(current)}
     
     while current != dest:
         closest = None
         closest_dist = float('inf')
-        for neighbor in current.neighbors:
+        if adjacency is not None:
+            neighbors = [nodes[j] for j in adjacency.neighbors(current.index)]
+        else:
+            neighbors = current.neighbors
+        for neighbor in neighbors:
             dist = neighbor.distance_to(dest)
             if dist < closest_dist:
                 closest = neighbor
@@ -53,6 +63,10 @@ def greedy_routing(src, dest):
         if closest is None:
             print("No more neighbors to route through.")
             break
+        if id(closest) in visited:
+            print("Greedy routing is stuck in a loop; stopping.")
+            break
+        visited.add(id(closest))
         
         # Print the distance to the next node
         distance_to_next = current.distance_to(closest)
@@ -65,19 +79,17 @@ def greedy_routing(src, dest):
 
 # Main function to run the simulation
 def main():
+    frames = FrameLoop(run_options(), fps=30)
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
     pygame.display.set_caption("Geographic Routing Protocol Simulation")
-    clock = pygame.time.Clock()
 
     # Create nodes
-    nodes = [Node(random.randint(50, 750), random.randint(50, 550)) for _ in range(20)]
+    nodes = [Node(random.randint(50, 750), random.randint(50, 550), i) for i in range(20)]
     
-    # Create neighbors (for simplicity, connect nodes within 100 pixels)
-    for node in nodes:
-        for other in nodes:
-            if node != other and node.distance_to(other) < 100:  
-                node.add_neighbor(other)
+    # Create neighbors (for simplicity, connect nodes within 100 pixels) as a CSR adjacency
+    with PROFILER.phase("connect"):
+        adjacency = build_csr_adjacency([node.x for node in nodes], [node.y for node in nodes], 100)
 
     # Create a packet
     src = random.choice(nodes)
@@ -87,7 +99,8 @@ def main():
     packet = Packet(src, dest, "Hello!")
 
     # Perform greedy routing
-    path = greedy_routing(src, dest)
+    with PROFILER.phase("route"):
+        path = greedy_routing(src, dest, nodes, adjacency)
 
     # Print packet attributes
     print(f"Packet Source: ({packet.src.x}, {packet.src.y})")
@@ -97,21 +110,26 @@ def main():
     print(f"Reliability: {packet.reliability:.2f}")
     print(f"Network Efficiency: {packet.network_efficiency:.2f}")
 
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        screen.fill((255, 255, 255))
-        draw_nodes(screen, nodes, [packet])
+    def draw_scene(surface):
+        surface.fill((255, 255, 255))
+        draw_nodes(surface, nodes, [packet])
 
         # Draw the path of the greedy routing
         for i in range(len(path) - 1):
-            pygame.draw.line(screen, (0, 0, 255), (int(path[i].x), int(path[i].y)), (int(path[i + 1].x), int(path[i + 1].y)), 2)
+            pygame.draw.line(surface, (0, 0, 255), (int(path[i].x), int(path[i].y)), (int(path[i + 1].x), int(path[i + 1].y)), 2)
+
+    renderer = LayeredRenderer(screen, draw_scene)  # Nothing moves: the scene is drawn once
+
+    running = frames.render  # Headless runs stop here: the window only shows the routed path
+    while running and frames.running():
+        for event in frames.events():
+            if event.type == pygame.QUIT:
+                running = False
 
-        pygame.display.flip()
-        clock.tick(30)
+        with PROFILER.phase("present"):
+            renderer.begin_frame()
+            renderer.present()
+        frames.tick()
 
     pygame.quit()
 
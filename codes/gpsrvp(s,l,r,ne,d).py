@@ -1,6 +1,17 @@
 import random
 import math
-import time
+from sim_clock import SimClock
+from headless import run_options
+from phase_profiler import PROFILER
+from spatial_index import build_grid
+from routing_engine import BatchRouter
+from channel_model import PathLossChannel
+from streaming_stats import METRICS, RunningStats
+
+DISTANCE_THRESHOLD = 20  # Example distance threshold
+
+CLOCK = SimClock()  # Link latencies advance simulated time instead of sleeping
+CHANNEL = PathLossChannel()  # Latency and delivery depend on the distance of each hop
 
 class Vehicle:
     def __init__(self, id, position, speed):
@@ -9,90 +20,109 @@ class Vehicle:
         self.speed = speed  # Speed of the vehicle
         self.neighbors = []  # List of neighboring vehicles
 
-    def update_neighbors(self, all_vehicles):
-        """Update neighbors based on distance."""
-        self.neighbors = [v for v in all_vehicles if v.id != self.id and self.distance(v) < 20]  # Example distance threshold
+    def update_neighbors(self, all_vehicles, grid=None):
+        """Update neighbors based on distance (only nearby grid cells are scanned when a grid is given)."""
+        candidates = grid.nearby(self) if grid is not None else all_vehicles
+        self.neighbors = [v for v in candidates if v.id != self.id and self.distance(v) < DISTANCE_THRESHOLD]
 
     def distance(self, other_vehicle):
         """Calculate Euclidean distance to another vehicle."""
         return math.sqrt((self.position[0] - other_vehicle.position[0]) ** 2 + 
                          (self.position[1] - other_vehicle.position[1]) ** 2)
 
-    def send_message(self, destination):
+    def send_message(self, destination, message=None):
         """Send message to destination vehicle."""
-        # Simulate latency based on speed
-        latency = random.uniform(0.01, 0.1)  # Latency between 10ms and 100ms
-        time.sleep(latency)  # Simulate time delay for message sending
-
         # Calculate and print distance to the next vehicle
         distance_to_next_vehicle = self.distance(destination)
 
-        # Simulate reliability
-        reliability = random.uniform(0, 1)  # Random number between 0 and 1
-        if reliability < 0.8:  # 80% success rate for message delivery
+        # The channel gives the hop latency and whether the message got through
+        latency, reliability, success = CHANNEL.sample_one(distance_to_next_vehicle)
+        CLOCK.send(latency, message)  # Simulated time delay for message sending
+        link = (self.id, destination.id)
+        METRICS.record("gpsr", "latency", latency, CLOCK.now, vehicle=self.id, link=link)
+        METRICS.record("gpsr", "delivery", float(success), vehicle=self.id, link=link, quantiles=False)
+
+        if success:
             print(f"Vehicle {self.id} sending message to Vehicle {destination.id}.")
             print(f"Distance to Vehicle {destination.id}: {distance_to_next_vehicle:.2f} meters")
-            print(f"Speed: {self.speed} units/s, Latency: {latency:.2f} seconds, Reliability: {reliability:.2f}")
+            print(f"Speed: {self.speed} units/s, Latency: {latency * 1000:.2f} ms, Reliability: {reliability:.4f}")
             return True, reliability  # Message sent successfully
         else:
-            print(f"Vehicle {self.id} failed to send message to Vehicle {destination.id}. Reliability: {reliability:.2f}")
+            print(f"Vehicle {self.id} failed to send message to Vehicle {destination.id}. Reliability: {reliability:.4f}")
             return False, reliability  # Message failed to send
 
 class GreedyPerimeterStatelessRouting:
     def __init__(self):
         self.total_messages = 0
         self.successful_messages = 0
-        self.reliabilities = []  # List to store reliability values
+        self.reliability = RunningStats()  # Reliability of the successful messages, in constant memory
 
     def route(self, sender, destination, visited=None):
         """Route message using GPSR with added logic for large platoon and straight road."""
         if visited is None:
             visited = set()  # Initialize visited set if not provided
+        message = CLOCK.message()  # Accumulates the end-to-end delay over every hop
 
-        print(f"\nRouting from Vehicle {sender.id} to Vehicle {destination.id}.")
+        while True:
+            print(f"\nRouting from Vehicle {sender.id} to Vehicle {destination.id}.")
 
-        if sender.id in visited:
-            print(f"Vehicle {sender.id} has already been visited. Ending route to prevent loops.")
-            return
-
-        visited.add(sender.id)  # Mark the sender as visited
-
-        if not sender.neighbors:
-            print(f"Vehicle {sender.id} has no neighbors to route to.")
-            return
+            if sender.id in visited:
+                print(f"Vehicle {sender.id} has already been visited. Ending route to prevent loops.")
+                return
 
-        # Greedy forwarding to the neighbor closest to the destination
-        closest_neighbor = min(sender.neighbors, key=lambda v: v.distance(destination))
-        success, reliability = sender.send_message(closest_neighbor)
-        self.total_messages += 1  # Increment for the attempted message
+            visited.add(sender.id)  # Mark the sender as visited
 
-        if success:
-            self.reliabilities.append(reliability)  # Store reliability of the successful message
-            if closest_neighbor.id == destination.id:
-                print(f"Vehicle {destination.id} received message successfully.")
-                self.successful_messages += 1
+            if not sender.neighbors:
+                print(f"Vehicle {sender.id} has no neighbors to route to.")
                 return
 
-            # Continue routing from the closest neighbor
-            self.route(closest_neighbor, destination, visited)
+            # Greedy forwarding to the neighbor closest to the destination
+            closest_neighbor = min(sender.neighbors, key=lambda v: v.distance(destination))
+            success, reliability = sender.send_message(closest_neighbor, message)
+            self.total_messages += 1  # Increment for the attempted message
+
+            if success:
+                self.reliability.add(reliability)  # Store reliability of the successful message
+                if closest_neighbor.id == destination.id:
+                    print(f"Vehicle {destination.id} received message successfully. "
+                          f"End-to-end delay: {message.delay:.3f} seconds over {message.hops} hops")
+                    self.successful_messages += 1
+                    CLOCK.deliver(message)
+                    return
+
+                # Continue routing from the closest neighbor
+                sender = closest_neighbor
+            else:
+                return  # Message lost on this hop
+
+    def route_batch(self, vehicles, pairs, max_hops=None, keep_paths=True):
+        """Route many (sender index, destination index) pairs iteratively without printing (greedy hops only, no message loss)."""
+        return BatchRouter(vehicles).route_batch(pairs, max_hops, keep_paths)
 
     def print_network_efficiency(self):
         """Print network efficiency and reliability statistics."""
         if self.total_messages > 0:
             efficiency = (self.successful_messages / self.total_messages) * 100  # Efficiency in percentage
-            avg_reliability = sum(self.reliabilities) / len(self.reliabilities) if self.reliabilities else 0
+            avg_reliability = self.reliability.mean
+            latency = METRICS.metric("gpsr", "latency").summary()
             print(f"\nNetwork Efficiency: {efficiency:.2f}%")
             print(f"Total Messages Sent: {self.total_messages}, Successful Messages: {self.successful_messages}")
             print(f"Average Reliability of Successful Messages: {avg_reliability:.2f}")
+            if latency["count"]:
+                print(f"Hop Latency: p50 {latency['p50'] * 1000:.2f} ms, p99 {latency['p99'] * 1000:.2f} ms, "
+                      f"p99.9 {latency['p99.9'] * 1000:.2f} ms over {latency['count']} hops")
+            print(f"Average End-to-End Delay: {CLOCK.average_delay:.3f} seconds (simulated time: {CLOCK.now:.3f} seconds)")
 
 # Simulate a straight road platoon of vehicles for GPSR
 def simulate_gpsr(num_vehicles):
     # Position vehicles in a line along the x-axis and assign random speeds
     vehicles = [Vehicle(i, (i * 10, 0), random.uniform(5, 15)) for i in range(num_vehicles)]
     
-    # Update neighbors for each vehicle based on proximity
-    for vehicle in vehicles:
-        vehicle.update_neighbors(vehicles)
+    # Update neighbors for each vehicle based on proximity, using a spatial grid
+    with PROFILER.phase("neighbors"):
+        grid = build_grid(vehicles, DISTANCE_THRESHOLD)
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
 
     # Route from the first vehicle to the last vehicle
     sender = vehicles[0]
@@ -101,10 +131,15 @@ def simulate_gpsr(num_vehicles):
     
     # Use Greedy Perimeter Stateless Routing
     gpsr = GreedyPerimeterStatelessRouting()
-    gpsr.route(sender, destination)
+    with PROFILER.phase("route"):
+        gpsr.route(sender, destination)
     
     # Print network efficiency and reliability statistics
-    gpsr.print_network_efficiency()
-
-# Run the simulation with a larger number of vehicles in a straight line
-simulate_gpsr(10)
+    with PROFILER.phase("print_stats"):
+        gpsr.print_network_efficiency()
+
+if __name__ == "__main__":
+    OPTIONS = run_options(windowed=False)
+    CLOCK = SimClock(OPTIONS.real_time_factor)  # Paced to real time only with --real-time-factor
+    # Run the simulation with a larger number of vehicles in a straight line
+    simulate_gpsr(10)
@@ -1,12 +1,24 @@
 import pygame
 import random
 import math
+from spatial_index import build_grid
+from routing_engine import RouteCache, DELIVERED, NO_NEIGHBORS, LOOP
+from perimeter import PlanarGraph
+from diameter import farthest_pair, k_farthest_pairs
+from headless import run_options, FrameLoop
+from render_cache import LayeredRenderer, TextCache
+from phase_profiler import PROFILER
+
+# Parse --headless/--steps/--seed before the window is opened
+FRAMES = FrameLoop(run_options())
 
 # Initialize Pygame
 pygame.init()
 screen = pygame.display.set_mode((800, 600))
 pygame.display.set_caption("GPSR Vehicle Routing Visualization")
 FONT = pygame.font.SysFont("Arial", 16)
+LABELS = TextCache(FONT)  # Vehicle id labels are rendered once
+RENDERER = None  # Static topology layer plus the routing arrows, set up by simulate_gpsr
 
 # Colors
 WHITE = (255, 255, 255)
@@ -15,6 +27,8 @@ GREEN = (0, 255, 0)
 RED = (255, 0, 0)
 CYAN = (0, 200, 200)
 
+DISTANCE_THRESHOLD = 100  # Adjusted distance
+
 class Vehicle:
     def __init__(self, id, position, speed):
         self.id = id
@@ -22,9 +36,10 @@ class Vehicle:
         self.speed = speed  # Speed of the vehicle
         self.neighbors = []  # List of neighboring vehicles
 
-    def update_neighbors(self, all_vehicles):
-        """Update neighbors based on distance threshold."""
-        self.neighbors = [v for v in all_vehicles if v.id != self.id and self.distance(v) < 100]  # Adjusted distance
+    def update_neighbors(self, all_vehicles, grid=None):
+        """Update neighbors based on distance threshold (only nearby grid cells are scanned when a grid is given)."""
+        candidates = grid.nearby(self) if grid is not None else all_vehicles
+        self.neighbors = [v for v in candidates if v.id != self.id and self.distance(v) < DISTANCE_THRESHOLD]
 
     def distance(self, other_vehicle):
         """Calculate Euclidean distance to another vehicle."""
@@ -34,10 +49,11 @@ class Vehicle:
     def send_message(self, destination):
         """Send message to destination vehicle (visualized as an arrow)."""
         distance_to_destination = self.distance(destination)
-        pygame.draw.line(screen, CYAN, self.position, destination.position, 2)
-        draw_arrow(screen, self.position, destination.position, CYAN)
-        pygame.display.flip()
-        pygame.time.delay(300)
+        if FRAMES.render:
+            RENDERER.mark(pygame.draw.line(screen, CYAN, self.position, destination.position, 2))
+            RENDERER.mark(draw_arrow(screen, self.position, destination.position, CYAN))
+            RENDERER.present()  # Only the arrow's region is sent to the display
+        FRAMES.delay(300)
         print(f"Vehicle {self.id} sending message to Vehicle {destination.id}. Distance: {distance_to_destination:.2f} units")
 
     def calculate_metrics(self, latency_factor=1.0):
@@ -49,66 +65,130 @@ class Vehicle:
         return latency, reliability, network_efficiency
 
 class GreedyPerimeterStatelessRouting:
-    def route(self, sender, destination, visited=None):
-        """Route message using GPSR."""
+    def __init__(self, planar=None, cache=None):
+        self.planar = planar  # Planar subgraph for perimeter mode; greedy-only without it
+        self.cache = cache if cache is not None else RouteCache()
+
+    @property
+    def topology_version(self):
+        """Version of the neighbor graph that routes are cached under (None: nothing is cached)."""
+        return self.planar.version if self.planar is not None else None
+
+    def plan(self, sender, destination, visited=None):
+        """Work out the vehicles a message visits and why the route ended (cached per topology version)."""
+        version = self.topology_version
+        key = (sender.id, destination.id, version)
+        cacheable = visited is None and version is not None
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         if visited is None:
             visited = set()
+        state = self.planar.packet() if self.planar is not None else None
+        path = [sender]
+
+        while True:
+            # Perimeter mode may pass through a vehicle twice, so only greedy-only routing stops on revisits
+            if state is None:
+                if sender.id in visited:
+                    reason = LOOP
+                    break
+                visited.add(sender.id)  # Mark the sender as visited
+
+            if not sender.neighbors:
+                reason = NO_NEIGHBORS
+                break
 
-        print(f"\nRouting from Vehicle {sender.id} to Vehicle {destination.id}.")
-
-        if sender.id in visited:
-            print(f"Vehicle {sender.id} has already been visited. Ending route to prevent loops.")
-            return
-
-        visited.add(sender.id)  # Mark the sender as visited
-
-        if not sender.neighbors:
-            print(f"Vehicle {sender.id} has no neighbors to route to.")
-            return
+            if state is None:
+                # Greedy forwarding to the neighbor closest to the destination
+                closest_neighbor = min(sender.neighbors, key=lambda v: v.distance(destination))
+            else:
+                # Greedy forwarding, switching to perimeter mode at local minima
+                hop = self.planar.next_hop(self.planar.index_of(sender), self.planar.index_of(destination), state)
+                if hop is None:
+                    reason = LOOP  # Unreachable: perimeter mode walked the whole face
+                    break
+                closest_neighbor = self.planar.vehicles[hop]
+            path.append(closest_neighbor)
+
+            if closest_neighbor.id == destination.id:
+                reason = DELIVERED
+                break
 
-        # Greedy forwarding to the neighbor closest to the destination
-        closest_neighbor = min(sender.neighbors, key=lambda v: v.distance(destination))
-        sender.send_message(closest_neighbor)
+            # Continue routing from the closest neighbor
+            sender = closest_neighbor
 
-        # Print metrics for the sender vehicle
-        latency, reliability, efficiency = sender.calculate_metrics()
-        print(f"Metrics for Vehicle {sender.id}: Speed={sender.speed:.2f} units/s, "
-              f"Latency={latency:.2f}s, Reliability={reliability:.2f}, Network Efficiency={efficiency:.2f}")
+        if cacheable:
+            self.cache.put(key, (path, reason), len(path))
+        return path, reason
 
-        # If the closest neighbor is the destination
-        if closest_neighbor.id == destination.id:
-            print(f"Vehicle {destination.id} received message successfully.")
-            latency, reliability, efficiency = closest_neighbor.calculate_metrics()
-            print(f"Metrics for Vehicle {closest_neighbor.id}: Speed={closest_neighbor.speed:.2f} units/s, "
+    def route(self, sender, destination, visited=None):
+        """Route message using GPSR (the hops are planned once per topology and replayed)."""
+        with PROFILER.phase("plan"):
+            path, reason = self.plan(sender, destination, visited)
+
+        for k, sender in enumerate(path):
+            print(f"\nRouting from Vehicle {sender.id} to Vehicle {destination.id}.")
+
+            if k == len(path) - 1:  # The route ended at this vehicle
+                if reason == NO_NEIGHBORS:
+                    print(f"Vehicle {sender.id} has no neighbors to route to.")
+                elif self.planar is None:
+                    print(f"Vehicle {sender.id} has already been visited. Ending route to prevent loops.")
+                else:
+                    print(f"Vehicle {destination.id} is unreachable from Vehicle {sender.id}.")
+                return
+
+            closest_neighbor = path[k + 1]
+            with PROFILER.phase("send_message"):
+                sender.send_message(closest_neighbor)
+
+            # Print metrics for the sender vehicle
+            latency, reliability, efficiency = sender.calculate_metrics()
+            print(f"Metrics for Vehicle {sender.id}: Speed={sender.speed:.2f} units/s, "
                   f"Latency={latency:.2f}s, Reliability={reliability:.2f}, Network Efficiency={efficiency:.2f}")
-            return
 
-        # Continue routing from the closest neighbor
-        self.route(closest_neighbor, destination, visited)
+            # If the closest neighbor is the destination
+            if closest_neighbor.id == destination.id:
+                print(f"Vehicle {destination.id} received message successfully.")
+                latency, reliability, efficiency = closest_neighbor.calculate_metrics()
+                print(f"Metrics for Vehicle {closest_neighbor.id}: Speed={closest_neighbor.speed:.2f} units/s, "
+                      f"Latency={latency:.2f}s, Reliability={reliability:.2f}, Network Efficiency={efficiency:.2f}")
+                return
+
+    def route_batch(self, pairs, max_hops=None, keep_paths=True):
+        """Route many (sender index, destination index) pairs over the planar graph without printing.
+
+        Indices are into planar.vehicles. Routes use greedy and perimeter
+        forwarding like route and are cached under the planar graph's topology
+        version.
+        """
+        if self.planar is None:
+            raise ValueError("route_batch needs a planar graph")
+        return self.cache.route_batch(lambda: self.planar, pairs, ("batch", self.planar.version), max_hops, keep_paths)
 
 def draw_arrow(screen, start_pos, end_pos, color, arrow_size=10):
-    """Draw an arrow from start_pos to end_pos."""
-    pygame.draw.line(screen, color, start_pos, end_pos, 2)
+    """Draw an arrow from start_pos to end_pos and return the rect it covers."""
+    line = pygame.draw.line(screen, color, start_pos, end_pos, 2)
     angle = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0])
     arrow_end1 = (end_pos[0] - arrow_size * math.cos(angle - math.pi / 6),
                   end_pos[1] - arrow_size * math.sin(angle - math.pi / 6))
     arrow_end2 = (end_pos[0] - arrow_size * math.cos(angle + math.pi / 6),
                   end_pos[1] - arrow_size * math.sin(angle + math.pi / 6))
-    pygame.draw.polygon(screen, color, [end_pos, arrow_end1, arrow_end2])
+    return line.union(pygame.draw.polygon(screen, color, [end_pos, arrow_end1, arrow_end2]))
 
-def find_farthest_vehicles(vehicles):
-    """Find the two vehicles that are farthest apart."""
-    max_distance = 0
-    farthest_pair = (vehicles[0], vehicles[0])  # Initialize with the first vehicle
+def find_farthest_vehicles(vehicles, k=None):
+    """Find the two vehicles that are farthest apart (convex hull and rotating calipers, O(n log n)).
 
-    for i in range(len(vehicles)):
-        for j in range(i + 1, len(vehicles)):
-            dist = vehicles[i].distance(vehicles[j])
-            if dist > max_distance:
-                max_distance = dist
-                farthest_pair = (vehicles[i], vehicles[j])
-
-    return farthest_pair
+    With k, return the k farthest pairs instead, farthest first, e.g. as
+    long-haul endpoints for stress tests.
+    """
+    positions = [v.position for v in vehicles]
+    if k is not None:
+        return [(vehicles[i], vehicles[j]) for i, j, _ in k_farthest_pairs(positions, k)]
+    i, j = farthest_pair(positions)
+    return vehicles[i], vehicles[j]
 
 def create_vehicle_cluster(num_clusters, vehicles_per_cluster):
     """Create a cluster of vehicles in a grid-like arrangement.""" 
@@ -137,23 +217,26 @@ def create_vehicle_cluster(num_clusters, vehicles_per_cluster):
     return vehicles
 
 def simulate_gpsr(num_clusters, vehicles_per_cluster):
+    global RENDERER
     # Create clustered vehicles
     vehicles = create_vehicle_cluster(num_clusters, vehicles_per_cluster)
 
-    # Update neighbors for each vehicle based on proximity
-    for vehicle in vehicles:
-        vehicle.update_neighbors(vehicles)
+    # Update neighbors for each vehicle based on proximity, using a spatial grid
+    with PROFILER.phase("neighbors"):
+        grid = build_grid(vehicles, DISTANCE_THRESHOLD)
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
 
     # Find the farthest vehicles for routing
     sender, destination = find_farthest_vehicles(vehicles)
     print(f"Starting routing from Vehicle {sender.id} to Vehicle {destination.id}.\n")
     
-    # Use Greedy Perimeter Stateless Routing
-    gpsr = GreedyPerimeterStatelessRouting()
+    # Use Greedy Perimeter Stateless Routing with a Gabriel-graph planarization for perimeter mode
+    with PROFILER.phase("planarize"):
+        gpsr = GreedyPerimeterStatelessRouting(PlanarGraph(vehicles, DISTANCE_THRESHOLD))
 
-    running = True
-    while running:
-        screen.fill(WHITE)
+    def draw_topology(surface):
+        surface.fill(WHITE)
 
         # Draw vehicles
         for vehicle in vehicles:
@@ -162,26 +245,36 @@ def simulate_gpsr(num_clusters, vehicles_per_cluster):
                 color = GREEN  # Starting vehicle in green
             elif vehicle == destination:
                 color = RED    # Destination vehicle in red
-            pygame.draw.circle(screen, color, vehicle.position, 10)
-            label = FONT.render(str(vehicle.id), True, WHITE)
-            screen.blit(label, (vehicle.position[0] - 5, vehicle.position[1] - 5))
+            pygame.draw.circle(surface, color, vehicle.position, 10)
+            label = LABELS.render(str(vehicle.id), True, WHITE)
+            surface.blit(label, (vehicle.position[0] - 5, vehicle.position[1] - 5))
 
             # Draw neighbor connections
             for neighbor in vehicle.neighbors:
-                pygame.draw.line(screen, BLUE, vehicle.position, neighbor.position, 1)
+                pygame.draw.line(surface, BLUE, vehicle.position, neighbor.position, 1)
+
+    # The topology is drawn once; each frame only erases last frame's arrows (call invalidate() after vehicles move)
+    RENDERER = LayeredRenderer(screen, draw_topology)
 
-        pygame.display.flip()
+    running = True
+    while running and FRAMES.running():
+        if FRAMES.render:
+            with PROFILER.phase("present"):
+                RENDERER.begin_frame()
+                RENDERER.present()
 
         # Start routing visualization
         gpsr.route(sender, destination)
 
         # Main loop to keep the window open
-        for event in pygame.event.get():
+        for event in FRAMES.events():
             if event.type == pygame.QUIT:
                 running = False
                 break
+        FRAMES.tick()
 
     pygame.quit()
 
-# Run the simulation with a clustered arrangement of vehicles
-simulate_gpsr(num_clusters=3, vehicles_per_cluster=5)
+if __name__ == "__main__":
+    # Run the simulation with a clustered arrangement of vehicles
+    simulate_gpsr(num_clusters=3, vehicles_per_cluster=5)
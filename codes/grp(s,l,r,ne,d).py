@@ -1,5 +1,11 @@
 import random
 import math
+from spatial_index import build_grid
+from routing_engine import BatchRouter
+from headless import run_options
+from phase_profiler import PROFILER
+
+DISTANCE_THRESHOLD = 10  # Increase the distance threshold for better neighbor detection
 
 class Vehicle:
     def __init__(self, id, position):
@@ -15,10 +21,10 @@ class Vehicle:
         """Calculate network efficiency based on speed and reliability."""
         return self.speed * self.reliability
 
-    def update_neighbors(self, all_vehicles):
-        """Update neighbors based on distance."""
-        distance_threshold = 10  # Increase the distance threshold for better neighbor detection
-        self.neighbors = [v for v in all_vehicles if v.id != self.id and abs(self.position - v.position) < distance_threshold]
+    def update_neighbors(self, all_vehicles, grid=None):
+        """Update neighbors based on distance (only nearby grid cells are scanned when a grid is given)."""
+        candidates = grid.nearby(self) if grid is not None else all_vehicles
+        self.neighbors = [v for v in candidates if v.id != self.id and abs(self.position - v.position) < DISTANCE_THRESHOLD]
         print(f"Vehicle {self.id} neighbors: {[v.id for v in self.neighbors]}")  # Debug print
 
     def send_message(self, destination):
@@ -38,46 +44,53 @@ class GeographicRoutingProtocol:
         """Route message using Geographic Routing Protocol."""
         if visited is None:
             visited = set()
-        
-        print(f"Routing using GRP from Vehicle {sender.id} to Vehicle {destination.id}.")
-        
-        if sender.id in visited:
-            print(f"Vehicle {sender.id} already visited; stopping recursion.")
-            return
-        
-        visited.add(sender.id)
 
-        if not sender.neighbors:
-            print(f"Vehicle {sender.id} has no neighbors to route to.")
-            return
-        
-        # Filter out the sender from neighbors
-        valid_neighbors = [v for v in sender.neighbors if v.id != sender.id]
+        while True:
+            print(f"Routing using GRP from Vehicle {sender.id} to Vehicle {destination.id}.")
 
-        if not valid_neighbors:
-            print(f"Vehicle {sender.id} has no valid neighbors to route to.")
-            return
+            if sender.id in visited:
+                print(f"Vehicle {sender.id} already visited; stopping recursion.")
+                return
 
-        # Greedily forward to the neighbor closest to the destination
-        closest_neighbor = min(valid_neighbors, key=lambda v: abs(destination.position - v.position))
-        sender.send_message(closest_neighbor)
+            visited.add(sender.id)
 
-        # Check if the closest neighbor is the destination
-        if closest_neighbor.id == destination.id:
-            print(f"Vehicle {closest_neighbor.id} received message from Vehicle {sender.id}.")
-            return
-        
-        # Continue routing from the closest neighbor
-        self.route(closest_neighbor, destination, visited)
+            if not sender.neighbors:
+                print(f"Vehicle {sender.id} has no neighbors to route to.")
+                return
+
+            # Filter out the sender from neighbors
+            valid_neighbors = [v for v in sender.neighbors if v.id != sender.id]
+
+            if not valid_neighbors:
+                print(f"Vehicle {sender.id} has no valid neighbors to route to.")
+                return
+
+            # Greedily forward to the neighbor closest to the destination
+            closest_neighbor = min(valid_neighbors, key=lambda v: abs(destination.position - v.position))
+            sender.send_message(closest_neighbor)
+
+            # Check if the closest neighbor is the destination
+            if closest_neighbor.id == destination.id:
+                print(f"Vehicle {closest_neighbor.id} received message from Vehicle {sender.id}.")
+                return
+
+            # Continue routing from the closest neighbor
+            sender = closest_neighbor
+
+    def route_batch(self, vehicles, pairs, max_hops=None, keep_paths=True):
+        """Route many (sender index, destination index) pairs iteratively without printing."""
+        return BatchRouter(vehicles).route_batch(pairs, max_hops, keep_paths)
 
 # Simulate a platoon of vehicles on a straight road for GRP
 def simulate_grp(num_vehicles):
     # Place vehicles in a straight line with reduced spacing
     vehicles = [Vehicle(i, i * 8) for i in range(num_vehicles)]  # Each vehicle spaced 8 units apart on the x-axis
     
-    # Update neighbors for each vehicle
-    for vehicle in vehicles:
-        vehicle.update_neighbors(vehicles)
+    # Update neighbors for each vehicle using a spatial grid instead of scanning the whole platoon
+    with PROFILER.phase("neighbors"):
+        grid = build_grid(vehicles, DISTANCE_THRESHOLD)
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
 
     # Example routing from Vehicle 0 to Vehicle 9 (only if there are at least 10 vehicles)
     if num_vehicles > 9:
@@ -87,9 +100,12 @@ def simulate_grp(num_vehicles):
         
         # Create instance of Geographic Routing Protocol
         grp = GeographicRoutingProtocol()
-        grp.route(sender, destination)
+        with PROFILER.phase("route"):
+            grp.route(sender, destination)
     else:
         print("Not enough vehicles to perform routing from Vehicle 0 to Vehicle 9.")
 
-# Run the simulation for GRP with a defined number of vehicles
-simulate_grp(10)
+if __name__ == "__main__":
+    # Run the simulation for GRP with a defined number of vehicles (--seed N, --profile)
+    run_options()
+    simulate_grp(10)
@@ -1,5 +1,11 @@
 import random
 import math
+from spatial_index import build_grid
+from routing_engine import BatchRouter, closest_to_sender
+from headless import run_options
+from phase_profiler import PROFILER
+
+DISTANCE_THRESHOLD = 10  # Example distance threshold
 
 class Vehicle:
     def __init__(self, id, position):
@@ -11,9 +17,10 @@ class Vehicle:
         self.reliability = random.uniform(0.7, 1.0)  # Random reliability factor
         self.network_efficiency = self.calculate_network_efficiency()
 
-    def update_neighbors(self, all_vehicles):
-        """Update neighbors based on distance."""
-        self.neighbors = [v for v in all_vehicles if v.id != self.id and self.distance(v) < 10]  # Example distance threshold
+    def update_neighbors(self, all_vehicles, grid=None):
+        """Update neighbors based on distance (only nearby grid cells are scanned when a grid is given)."""
+        candidates = grid.nearby(self) if grid is not None else all_vehicles
+        self.neighbors = [v for v in candidates if v.id != self.id and self.distance(v) < DISTANCE_THRESHOLD]
         print(f"Vehicle {self.id} neighbors: {[v.id for v in self.neighbors]}")  # Debug print
 
     def distance(self, other_vehicle):
@@ -47,39 +54,46 @@ class GeographicRoutingProtocol:
         """Route message using Geographic Routing Protocol."""
         if visited is None:
             visited = set()
-        
-        print(f"Routing using GRP from Vehicle {sender.id} to Vehicle {destination.id}.")
-        
-        if sender.id in visited:
-            print(f"Vehicle {sender.id} already visited; stopping recursion.")
-            return
-        
-        visited.add(sender.id)
 
-        if not sender.neighbors:
-            print(f"Vehicle {sender.id} has no neighbors to route to.")
-            return
-        
-        # Greedily forward to the neighbor closest to the destination
-        closest_neighbor = min(sender.neighbors, key=lambda v: sender.distance(v))
-        sender.send_message(closest_neighbor)
-        
-        # Check if the closest neighbor is the destination
-        if closest_neighbor.id == destination.id:
-            print(f"Vehicle {closest_neighbor.id} received message from Vehicle {sender.id}.")
-            closest_neighbor.print_metrics()  # Print metrics for the destination
-            return
-        
-        # Continue routing from the closest neighbor
-        self.route(closest_neighbor, destination, visited)
+        while True:
+            print(f"Routing using GRP from Vehicle {sender.id} to Vehicle {destination.id}.")
+
+            if sender.id in visited:
+                print(f"Vehicle {sender.id} already visited; stopping recursion.")
+                return
+
+            visited.add(sender.id)
+
+            if not sender.neighbors:
+                print(f"Vehicle {sender.id} has no neighbors to route to.")
+                return
+
+            # Greedily forward to the neighbor closest to the destination
+            closest_neighbor = min(sender.neighbors, key=lambda v: sender.distance(v))
+            sender.send_message(closest_neighbor)
+
+            # Check if the closest neighbor is the destination
+            if closest_neighbor.id == destination.id:
+                print(f"Vehicle {closest_neighbor.id} received message from Vehicle {sender.id}.")
+                closest_neighbor.print_metrics()  # Print metrics for the destination
+                return
+
+            # Continue routing from the closest neighbor
+            sender = closest_neighbor
+
+    def route_batch(self, vehicles, pairs, max_hops=None, keep_paths=True):
+        """Route many (sender index, destination index) pairs iteratively without printing."""
+        return BatchRouter(vehicles, key=closest_to_sender).route_batch(pairs, max_hops, keep_paths)
 
 # Simulate a platoon of vehicles for GRP
 def simulate_grp(num_vehicles):
     vehicles = [Vehicle(i, (random.uniform(0, 20), random.uniform(0, 20))) for i in range(num_vehicles)]  # Smaller area for positions
     
-    # Update neighbors for each vehicle
-    for vehicle in vehicles:
-        vehicle.update_neighbors(vehicles)
+    # Update neighbors for each vehicle using a spatial grid instead of scanning the whole platoon
+    with PROFILER.phase("neighbors"):
+        grid = build_grid(vehicles, DISTANCE_THRESHOLD)
+        for vehicle in vehicles:
+            vehicle.update_neighbors(vehicles, grid)
 
     # Example routing from Vehicle 0 to Vehicle 5
     sender = vehicles[0]
@@ -88,7 +102,10 @@ def simulate_grp(num_vehicles):
     
     # Create instance of Geographic Routing Protocol
     grp = GeographicRoutingProtocol()
-    grp.route(sender, destination)
+    with PROFILER.phase("route"):
+        grp.route(sender, destination)
 
-# Run the simulation for GRP with a defined number of vehicles
-simulate_grp(10)
+if __name__ == "__main__":
+    # Run the simulation for GRP with a defined number of vehicles (--seed N, --profile)
+    run_options()
+    simulate_grp(10)
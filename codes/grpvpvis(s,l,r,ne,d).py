@@ -1,5 +1,15 @@
+import os
 import simpy
 import random
+import math
+from headless import run_options
+from trace_writer import open_trace
+from spatial_index import RoadIndex
+from channel_model import PathLossChannel
+from tick_scheduler import TickScheduler
+from streaming_stats import METRICS
+from phase_profiler import PROFILER
+from checkpoint import Checkpointer, checkpoint_options, load as load_checkpoint
 
 # Constants
 VEHICLE_COUNT = 5
@@ -11,35 +21,66 @@ PEDESTRIAN_ALERT_RANGE = 50  # meters
 # Simulated network parameters
 LATENCY_MEAN = 0.1  # mean latency in seconds
 LATENCY_STDDEV = 0.02  # standard deviation of latency
-RELIABILITY_THRESHOLD = 0.9  # 90% reliability for communication
 NETWORK_EFFICIENCY_BASE = 0.8  # Base efficiency of communication
+CHANNEL = PathLossChannel()  # V2V link latency and delivery depend on distance and channel load
+
+# Per-second vehicle state goes to the trace (--trace FILE); console output is sampled (--print-every N)
+CHECKPOINT_OPTIONS = checkpoint_options()
+RESUMING = bool(CHECKPOINT_OPTIONS.resume and CHECKPOINT_OPTIONS.checkpoint and os.path.exists(CHECKPOINT_OPTIONS.checkpoint))
+TRACE = open_trace(run_options(), append=RESUMING)  # A resumed run keeps the trace up to its checkpoint
 
 class Vehicle:
-    def __init__(self, env, name, position):
+    def __init__(self, env, name, position, vehicle_id=0, own_process=True):
         self.env = env
         self.name = name
+        self.id = vehicle_id
         self.position = position
         self.speed = random.randint(20, 60)  # Random speed in km/h
         self.status = "active"
         self.communication_range = COMMUNICATION_RANGE
-        self.env.process(self.run())
+        # Last V2V link measurements, recorded in the trace
+        self.latency = math.nan
+        self.reliability = math.nan
+        self.network_efficiency = math.nan
+        self.distance_ahead = math.nan
+        self.moved = False
+        if own_process:  # Otherwise a TickScheduler calls step() every second
+            self.env.process(self.run())
 
     def run(self):
         while True:
-            # Simulate vehicle movement
-            self.position += self.speed / 3.6  # Convert speed to m/s
-            print(f"{self.name} moving to {self.position:.2f} meters at {self.env.now:.2f} seconds.")
+            self.step()
             yield self.env.timeout(1)  # Update every second
-            
-            # Communicate with nearby vehicles and infrastructure
-            self.communicate()
+
+    def step(self):
+        # Communicate with nearby vehicles and infrastructure, from the second tick on
+        if self.moved:
+            with PROFILER.phase("communicate"):
+                self.communicate()
+
+        # Simulate vehicle movement
+        with PROFILER.phase("move"):
+            self.position += self.speed / 3.6  # Convert speed to m/s
+            self.moved = True
+            TRACE.record(int(self.env.now), self.id, self.position, 0, self.speed, self.latency,
+                         self.reliability, self.network_efficiency, self.distance_ahead)
+            if TRACE.sample(self.env.now):
+                print(f"{self.name} moving to {self.position:.2f} meters at {self.env.now:.2f} seconds.")
 
     def communicate(self):
         # Direct Vehicle-to-Vehicle (V2V) Communication
-        print(f"{self.name} checking for nearby vehicles at {self.env.now:.2f} seconds.")
-        for vehicle in vehicles:
-            if vehicle != self and abs(vehicle.position - self.position) <= self.communication_range:
-                self.v2v_communication(vehicle)
+        if TRACE.sample(self.env.now):
+            print(f"{self.name} checking for nearby vehicles at {self.env.now:.2f} seconds.")
+        self.distance_ahead = math.nan
+        in_range = [v for v in vehicle_index.at(self.env.now).within(self.position, self.communication_range) if v != self]
+        # Every link of this broadcast is drawn in one channel batch; the senders in range share the channel
+        distances = [abs(vehicle.position - self.position) for vehicle in in_range]
+        latencies, reliabilities, successes = CHANNEL.sample(distances, CHANNEL.utilization(len(in_range) + 1, 1))
+        for vehicle, latency, reliability, success in zip(in_range, latencies.tolist(), reliabilities.tolist(), successes.tolist()):
+            self.v2v_communication(vehicle, latency, reliability, success)
+            gap = vehicle.position - self.position
+            if gap > 0 and (math.isnan(self.distance_ahead) or gap < self.distance_ahead):
+                self.distance_ahead = gap  # Closest vehicle ahead within range
 
         # Vehicle-to-Infrastructure (V2I) Communication
         self.v2i_communication()
@@ -47,13 +88,19 @@ class Vehicle:
         # Alert nearby pedestrians
         self.alert_pedestrians()
 
-    def v2v_communication(self, other_vehicle):
-        latency = random.gauss(LATENCY_MEAN, LATENCY_STDDEV)
-        reliability = random.random()  # Simulate reliability as a random float between 0 and 1
+    def v2v_communication(self, other_vehicle, latency, reliability, success):
         distance_to_other_vehicle = abs(other_vehicle.position - self.position)
+        sampled = TRACE.sample(self.env.now)
+        self.latency = latency
+        self.reliability = reliability
+        link = (self.id, other_vehicle.id)
+        METRICS.record("grp", "latency", latency, self.env.now, vehicle=self.id, link=link)
+        METRICS.record("grp", "delivery", float(success), vehicle=self.id, link=link, quantiles=False)
 
-        if reliability >= RELIABILITY_THRESHOLD:
-            print(f"{self.name} communicates with {other_vehicle.name} at {self.env.now:.2f} seconds with latency {latency:.2f} seconds.")
+        if success:
+            self.network_efficiency = NETWORK_EFFICIENCY_BASE + (reliability * 0.2)
+            if sampled:
+                print(f"{self.name} communicates with {other_vehicle.name} at {self.env.now:.2f} seconds with latency {latency * 1000:.2f} ms.")
             data = {
                 "speed": self.speed,
                 "position": self.position,
@@ -63,14 +110,17 @@ class Vehicle:
                 "network_efficiency": NETWORK_EFFICIENCY_BASE + (reliability * 0.2),  # Adjust efficiency based on reliability
                 "distance_to_next_vehicle": distance_to_other_vehicle
             }
-            print(f"Data exchanged: {data}")
-            print(f"Distance to {other_vehicle.name}: {distance_to_other_vehicle:.2f} meters")
-        else:
-            print(f"{self.name} failed to communicate with {other_vehicle.name} due to low reliability at {self.env.now:.2f} seconds.")
+            if sampled:
+                print(f"Data exchanged: {data}")
+                print(f"Distance to {other_vehicle.name}: {distance_to_other_vehicle:.2f} meters")
+        elif sampled:
+            print(f"{self.name} failed to communicate with {other_vehicle.name} (reliability {reliability:.3f}) at {self.env.now:.2f} seconds.")
 
     def v2i_communication(self):
         latency = random.gauss(LATENCY_MEAN, LATENCY_STDDEV)
-        print(f"{self.name} communicating with infrastructure at {self.env.now:.2f} seconds with latency {latency:.2f} seconds.")
+        sampled = TRACE.sample(self.env.now)
+        if sampled:
+            print(f"{self.name} communicating with infrastructure at {self.env.now:.2f} seconds with latency {latency:.2f} seconds.")
         data = {
             "speed": self.speed,
             "position": self.position,
@@ -79,28 +129,37 @@ class Vehicle:
             "latency": latency,
             "network_efficiency": NETWORK_EFFICIENCY_BASE + (random.random() * 0.2)  # Random efficiency for demo
         }
-        print(f"Data exchanged with infrastructure: {data}")
+        if sampled:
+            print(f"Data exchanged with infrastructure: {data}")
 
     def alert_pedestrians(self):
-        for pedestrian in pedestrians:
-            if abs(pedestrian.position - self.position) <= PEDESTRIAN_ALERT_RANGE:
-                pedestrian.receive_alert(self)
+        for pedestrian in pedestrian_index.at(self.env.now).within(self.position, PEDESTRIAN_ALERT_RANGE):
+            pedestrian.receive_alert(self)
 
 class Pedestrian:
-    def __init__(self, env, name, position):
+    def __init__(self, env, name, position, own_process=True):
         self.env = env
         self.name = name
         self.position = position
-        self.env.process(self.walk())
+        if own_process:  # Otherwise a TickScheduler calls step() every second
+            self.env.process(self.walk())
 
     def walk(self):
         while True:
-            # Simulate pedestrian movement
-            self.position += random.choice([-1, 1])  # Move left or right randomly
-            print(f"{self.name} walking to {self.position:.2f} meters at {self.env.now:.2f} seconds.")
+            self.step()
             yield self.env.timeout(1)  # Update every second
 
+    def step(self):
+        # Simulate pedestrian movement
+        with PROFILER.phase("walk"):
+            self.position += random.choice([-1, 1])  # Move left or right randomly
+            if TRACE.sample(self.env.now):
+                print(f"{self.name} walking to {self.position:.2f} meters at {self.env.now:.2f} seconds.")
+
     def receive_alert(self, vehicle):
+        if not TRACE.sample(self.env.now):
+            return  # Alerts only print on sampled steps
+
         # Alert message indicating the vehicle is approaching
         distance = abs(vehicle.position - self.position)
         if vehicle.position > self.position:
@@ -109,18 +168,109 @@ class Pedestrian:
             print(f"Alert: {self.name}, {vehicle.name} is approaching from ahead at {distance:.2f} meters!")
 
         # Notify about all approaching vehicles
-        for v in vehicles:
-            if v != vehicle and abs(v.position - self.position) <= PEDESTRIAN_ALERT_RANGE:
+        for v in vehicle_index.at(self.env.now).within(self.position, PEDESTRIAN_ALERT_RANGE):
+            if v != vehicle:
                 alert_distance = abs(v.position - self.position)
                 if v.position > self.position:
                     print(f"Also Alert: {self.name}, {v.name} is approaching from behind at {alert_distance:.2f} meters!")
                 else:
                     print(f"Also Alert: {self.name}, {v.name} is approaching from ahead at {alert_distance:.2f} meters!")
 
-# Initialize Simulation Environment
-env = simpy.Environment()
-vehicles = [Vehicle(env, f"Vehicle-{i}", position=random.randint(0, 200)) for i in range(VEHICLE_COUNT)]
-pedestrians = [Pedestrian(env, f"Pedestrian-{i}", position=random.randint(0, 200)) for i in range(PEDESTRIAN_COUNT)]
+# Simulation Environment (the vehicles and pedestrians are shared through these globals)
+env = None
+vehicles = []
+pedestrians = []
+vehicle_index = None  # Sorted positions for the range queries, re-sorted once per simulated second
+pedestrian_index = None
+ticks = None  # The TickScheduler of a tick-scheduled simulation
+
+def create_simulation(vehicle_count=VEHICLE_COUNT, pedestrian_count=PEDESTRIAN_COUNT, road_length=200, scheduler="tick"):
+    """Initialize the simulation environment with its vehicles and pedestrians.
+
+    scheduler="tick" advances every agent from one SimPy process per second;
+    scheduler="process" gives each agent its own process. Both produce the
+    same simulation.
+    """
+    global env, vehicles, pedestrians, vehicle_index, pedestrian_index, ticks
+    if scheduler not in ("tick", "process"):
+        raise ValueError(f"Unknown scheduler {scheduler!r}; choose 'tick' or 'process'")
+    env = simpy.Environment()
+    own = scheduler == "process"
+    vehicles = [Vehicle(env, f"Vehicle-{i}", position=random.randint(0, road_length), vehicle_id=i, own_process=own) for i in range(vehicle_count)]
+    pedestrians = [Pedestrian(env, f"Pedestrian-{i}", position=random.randint(0, road_length), own_process=own) for i in range(pedestrian_count)]
+    ticks = None
+    if not own:
+        ticks = TickScheduler(env)
+        ticks.add(vehicles, Vehicle.step)
+        ticks.add(pedestrians, Pedestrian.step)
+    # Within a second everybody moves at most once, by up to their speed (vehicles) or 1 m (pedestrians)
+    vehicle_index = RoadIndex(vehicles, slack=max((v.speed / 3.6 for v in vehicles), default=0))
+    pedestrian_index = RoadIndex(pedestrians, slack=1)
+    return env
+
+def simulation_state():
+    """Everything a tick-scheduled simulation continues from: clock, agents, indexes, random and channel state, metrics.
+
+    With one process per agent the pending events are suspended generators,
+    which cannot be saved, so only tick-scheduled simulations can be
+    checkpointed. The trace file is flushed and only its length is saved:
+    a resume cuts it back to that length and appends from there.
+    """
+    if ticks is None:
+        raise ValueError("Only tick-scheduled simulations can be checkpointed: agent processes cannot be saved")
+    return {
+        "now": env.now,
+        "ticks": ticks.ticks,
+        "vehicles": vehicles,
+        "pedestrians": pedestrians,
+        "vehicle_index": vehicle_index,
+        "pedestrian_index": pedestrian_index,
+        "random": random.getstate(),
+        "channel": CHANNEL,
+        "metrics": (METRICS.protocols, METRICS.vehicles, METRICS.links),
+        "trace": TRACE.offset(),
+    }
+
+def restore_simulation(path):
+    """Rebuild the simulation from a checkpoint file; it continues exactly as the saved run would have."""
+    global env, vehicles, pedestrians, vehicle_index, pedestrian_index, ticks, CHANNEL
+    state = load_checkpoint(path, {"env": None})  # The agents get the new environment below
+    env = simpy.Environment(initial_time=state["now"])
+    vehicles, pedestrians = state["vehicles"], state["pedestrians"]
+    for agent in vehicles + pedestrians:
+        agent.env = env
+    vehicle_index, pedestrian_index = state["vehicle_index"], state["pedestrian_index"]
+    # The saved run stopped just before the tick at "now", which the new scheduler runs first
+    ticks = TickScheduler(env)
+    ticks.ticks = state["ticks"]
+    ticks.add(vehicles, Vehicle.step)
+    ticks.add(pedestrians, Pedestrian.step)
+    random.setstate(state["random"])
+    CHANNEL = state["channel"]
+    METRICS.protocols, METRICS.vehicles, METRICS.links = state["metrics"]
+    TRACE.truncate(state["trace"])  # Rows recorded after the checkpoint are recorded again
+    return env
+
+def run_simulation(until, checkpoint=None, checkpoint_every=10):
+    """Run the simulation up to until, saving its state to the checkpoint file every checkpoint_every simulated seconds."""
+    if checkpoint is None:
+        env.run(until=until)
+        return
+    with Checkpointer(checkpoint, {"env": env}) as checkpointer:
+        while env.now < until:
+            env.run(until=min(env.now + checkpoint_every, until))
+            checkpointer.save(simulation_state())
 
-# Run Simulation
-env.run(until=20)  # Simulate for 20 seconds
+if __name__ == "__main__":
+    # Run Simulation (--checkpoint FILE saves it every --checkpoint-every seconds; --resume continues from FILE)
+    if RESUMING:
+        restore_simulation(CHECKPOINT_OPTIONS.checkpoint)
+    else:
+        create_simulation()
+    run_simulation(20, CHECKPOINT_OPTIONS.checkpoint, CHECKPOINT_OPTIONS.checkpoint_every)  # Simulate for 20 seconds
+    latency = METRICS.metric("grp", "latency").summary()
+    delivery = METRICS.metric("grp", "delivery", quantiles=False).summary()
+    if latency["count"]:
+        print(f"V2V Latency: p50 {latency['p50'] * 1000:.2f} ms, p99 {latency['p99'] * 1000:.2f} ms, "
+              f"p99.9 {latency['p99.9'] * 1000:.2f} ms; delivery ratio {delivery['mean']:.4f} over {delivery['count']} messages")
+    TRACE.close()
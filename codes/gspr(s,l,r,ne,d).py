@@ -1,6 +1,11 @@
 import random
 import pygame
 import math
+from adjacency import build_csr_adjacency
+from perimeter import PlanarGraph, PERIMETER
+from headless import run_options, FrameLoop
+from render_cache import LayeredRenderer, TextCache, get_font
+from phase_profiler import PROFILER
 
 class Node:
     def __init__(self, x, y, index):
@@ -32,27 +37,50 @@ def connect_nodes(nodes, threshold):
                 if dist < threshold:
                     nodes[i].add_neighbor(nodes[j])
 
+def connect_nodes_csr(nodes, threshold):
+    """Build the same neighbor graph as connect_nodes as a CSR adjacency, without Python loops."""
+    xs = [node.position[0] for node in nodes]
+    ys = [node.position[1] for node in nodes]
+    return build_csr_adjacency(xs, ys, threshold)
+
 def distance(pos1, pos2):
     return math.sqrt((pos1[0] - pos2[0]) ** 2 + (pos1[1] - pos2[1]) ** 2)
 
-def gpsr_route(source, destination):
+def gpsr_route(source, destination, nodes=None, adjacency=None, planar=None):
+    # Neighbors come from the CSR adjacency when one is given, otherwise from node.neighbors.
+    # With a planar graph, greedy dead ends fall back to perimeter (face) routing.
     current = source
     path = [current]
+    state = planar.packet() if planar is not None else None
     print(f"Routing from Node {source.index} at {source.position} to Node {destination.index} at {destination.position}")
 
     while current != destination:
-        next_node = None
-        best_distance = float('inf')
+        if planar is not None:
+            hop = planar.next_hop(current.index, destination.index, state)
+            next_node = planar.vehicles[hop] if hop is not None else None
+            forward = next_node is not None
+        else:
+            next_node = None
+            best_distance = float('inf')
+
+            if adjacency is not None:
+                neighbors = [nodes[j] for j in adjacency.neighbors(current.index)]
+            else:
+                neighbors = current.neighbors
 
-        for neighbor in current.neighbors:
-            dist = distance(neighbor.position, destination.position)
-            if dist < best_distance:
-                best_distance = dist
-                next_node = neighbor
+            for neighbor in neighbors:
+                dist = distance(neighbor.position, destination.position)
+                if dist < best_distance:
+                    best_distance = dist
+                    next_node = neighbor
 
-        if next_node and best_distance < distance(current.position, destination.position):
+            forward = next_node and best_distance < distance(current.position, destination.position)
+
+        if forward:
             dist_to_next = distance(current.position, next_node.position)
             print(f"\nNode {current.index} at {current.position} sends packet to Node {next_node.index} at {next_node.position}")
+            if state is not None and state.mode == PERIMETER:
+                print("Perimeter mode: following the face of the planar graph around a void")
             print(f"Distance to next node: {dist_to_next:.2f}")
             print(f"Speed: {current.speed:.2f} units/s, Latency: {current.latency:.2f}s, Reliability: {current.reliability:.2f}, Network Efficiency: {current.network_efficiency:.2f}")
 
@@ -63,64 +91,75 @@ def gpsr_route(source, destination):
             break  # Break if greedy forwarding fails
     return path
 
-def visualize(nodes, path, source, destination):
+def draw_scene(screen, nodes, path, source, destination):
+    screen.fill((255, 255, 255))  # Clear the screen
+    index_labels = TextCache(get_font(None, 24))  # Fonts are loaded once and labels rendered once
+
+    # Draw nodes with annotations
+    for node in nodes:
+        if node == source:
+            pygame.draw.circle(screen, (0, 255, 0), (node.position[0], node.position[1]), 10)  # Start node
+        elif node == destination:
+            pygame.draw.circle(screen, (255, 0, 0), (node.position[0], node.position[1]), 10)  # End node
+        else:
+            pygame.draw.circle(screen, (0, 0, 255), (node.position[0], node.position[1]), 5)  # Regular nodes
+
+        # Draw annotation (index) for each node
+        index_text = index_labels.render(str(node.index), True, (0, 0, 0))
+        screen.blit(index_text, (node.position[0] + 10, node.position[1] - 15))
+
+    # Draw the routing path with a highlighted line
+    if path:
+        for i in range(len(path) - 1):
+            pygame.draw.line(screen, (255, 0, 0), path[i].position, path[i + 1].position, 4)  # Thicker line for the path
+
+    # Draw labels for source and destination
+    font = get_font(None, 36)
+    source_label = font.render("Start", True, (0, 255, 0))
+    dest_label = font.render("End", True, (255, 0, 0))
+    screen.blit(source_label, (source.position[0] + 5, source.position[1] - 20))
+    screen.blit(dest_label, (destination.position[0] + 5, destination.position[1] - 20))
+
+def visualize(nodes, path, source, destination, frames):
     pygame.init()
     screen = pygame.display.set_mode((800, 600))
-    clock = pygame.time.Clock()
+    # Nothing moves, so the whole scene is a static layer drawn once
+    renderer = LayeredRenderer(screen, lambda surface: draw_scene(surface, nodes, path, source, destination))
     running = True
 
-    while running:
-        for event in pygame.event.get():
+    while running and frames.running():
+        for event in frames.events():
             if event.type == pygame.QUIT:
                 running = False
 
-        screen.fill((255, 255, 255))  # Clear the screen
-
-        # Draw nodes with annotations
-        for node in nodes:
-            if node == source:
-                pygame.draw.circle(screen, (0, 255, 0), (node.position[0], node.position[1]), 10)  # Start node
-            elif node == destination:
-                pygame.draw.circle(screen, (255, 0, 0), (node.position[0], node.position[1]), 10)  # End node
-            else:
-                pygame.draw.circle(screen, (0, 0, 255), (node.position[0], node.position[1]), 5)  # Regular nodes
-            
-            # Draw annotation (index) for each node
-            font = pygame.font.Font(None, 24)
-            index_text = font.render(str(node.index), True, (0, 0, 0))
-            screen.blit(index_text, (node.position[0] + 10, node.position[1] - 15))
-
-        # Draw the routing path with a highlighted line
-        if path:
-            for i in range(len(path) - 1):
-                pygame.draw.line(screen, (255, 0, 0), path[i].position, path[i + 1].position, 4)  # Thicker line for the path
-
-        # Draw labels for source and destination
-        font = pygame.font.Font(None, 36)
-        source_label = font.render("Start", True, (0, 255, 0))
-        dest_label = font.render("End", True, (255, 0, 0))
-        screen.blit(source_label, (source.position[0] + 5, source.position[1] - 20))
-        screen.blit(dest_label, (destination.position[0] + 5, destination.position[1] - 20))
-
-        pygame.display.flip()
-        clock.tick(60)
+        with PROFILER.phase("present"):
+            renderer.begin_frame()
+            renderer.present()
+        frames.tick()
 
     pygame.quit()
 
 def main():
+    frames = FrameLoop(run_options(), fps=60)
     num_nodes = 50
     width, height = 800, 600
     threshold = 150  # Adjusted threshold for distant nodes
 
     nodes = create_nodes(num_nodes, width, height)
-    connect_nodes(nodes, threshold)
+    with PROFILER.phase("connect"):
+        adjacency = connect_nodes_csr(nodes, threshold)
+    with PROFILER.phase("planarize"):
+        planar = PlanarGraph(nodes, threshold, adjacency)  # Gabriel graph used by perimeter mode, seeded from the CSR
 
     source = nodes[0]  # Choose the source node
     destination = nodes[9]  # Choose the destination node
 
-    path = gpsr_route(source, destination)
+    with PROFILER.phase("route"):
+        path = gpsr_route(source, destination, nodes, planar=planar)
 
-    visualize(nodes, path, source, destination)
+    # Headless runs stop here: the routing is done and the window only shows the result
+    if frames.render:
+        visualize(nodes, path, source, destination, frames)
 
 if __name__ == "__main__":
     main()
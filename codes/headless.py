@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+from phase_profiler import PROFILER
+
+DEFAULT_HEADLESS_STEPS = 1000  # Headless runs cannot be closed from a window, so they always stop
+
+def run_options(argv=None, windowed=True):
+    """Parse the options shared by the simulation scripts.
+
+    --headless, --steps N, --seed N and --real-time-factor X control the run;
+    --trace FILE and --print-every N select the trace file and console view;
+    --profile times the phases of the main loop and prints a breakdown at exit.
+
+    Must be called before pygame opens its window: headless runs switch SDL to
+    its dummy video driver so no display is needed. Unknown arguments are ignored.
+    Scripts without a window pass windowed=False: they are paced only when
+    --real-time-factor is given.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--headless", action="store_true", help="run without a window, delays or frame pacing")
+    parser.add_argument("--steps", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random module")
+    parser.add_argument("--real-time-factor", type=float, default=None,
+                        help="simulated seconds per wall-clock second (default 1 with a window, else unpaced)")
+    parser.add_argument("--trace", default=None, help="write a binary columnar vehicle trace to this file")
+    parser.add_argument("--print-every", type=int, default=0, help="print vehicle info every N steps (0 = never)")
+    parser.add_argument("--profile", action="store_true", help="print a per-phase timing breakdown at exit")
+    options, _ = parser.parse_known_args(argv)
+    if options.profile:
+        PROFILER.enable()
+    if options.real_time_factor is None and windowed and not options.headless:
+        options.real_time_factor = 1.0
+    if options.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        if options.steps is None:
+            options.steps = DEFAULT_HEADLESS_STEPS
+    if options.seed is not None:
+        random.seed(options.seed)
+    return options
+
+class FrameLoop:
+    """Frame pacing, event polling and the stop condition of a visualizer main loop.
+
+    In headless mode nothing is drawn, no events are polled and every delay is
+    skipped, so the simulation logic runs as fast as it can. The logic itself
+    is identical in both modes, so a run with the same seed gives the same results.
+    """
+
+    def __init__(self, options, fps=None):
+        self.render = not options.headless
+        self.steps = options.steps
+        self.fps = fps
+        self.frame = 0
+        self.clock = None
+        if self.render and fps:
+            import pygame
+            self.clock = pygame.time.Clock()
+
+    def running(self):
+        """True until the requested number of frames has been run."""
+        return self.steps is None or self.frame < self.steps
+
+    def events(self):
+        if not self.render:
+            return []
+        import pygame
+        with PROFILER.phase("events"):
+            return pygame.event.get()
+
+    def tick(self):
+        """End the current frame, waiting for the next one only when rendering."""
+        self.frame += 1
+        PROFILER.count("frames")
+        if self.clock is not None:
+            with PROFILER.phase("frame_wait"):
+                self.clock.tick(self.fps)
+
+    def delay(self, milliseconds):
+        """Pause for a visual effect (skipped in headless mode)."""
+        if self.render:
+            import pygame
+            pygame.time.delay(milliseconds)
@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+import numpy as np
+from script_loader import load_script
+from spatial_index import build_grid
+from routing_engine import BatchRouter
+from channel_model import urllc_channel
+from sim_clock import SimClock
+from trace_writer import TraceWriter, read_trace
+
+DELTA_TIME = 0.1  # Seconds between the steps of a recorded mobility trace
+LANE_WIDTH = 3.5  # Meters
+
+def record_mobility(path, vehicles=20, steps=600, delta_time=DELTA_TIME, spacing=8.0, lanes=2, seed=0):
+    """Record a highway scenario once to a vehicle trace file.
+
+    The vehicles start spacing meters apart, alternating over lanes, and
+    their speeds (m/s) follow a random walk pulled back towards 27.5 m/s, so
+    gaps open and close and links come and go. Only step, vehicle, x, y and
+    speed are filled in; every protocol replays the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(vehicles)
+    x = ids * spacing
+    y = (ids % lanes) * LANE_WIDTH
+    speed = rng.uniform(25, 30, vehicles)
+    with TraceWriter(path) as trace:
+        for step in range(steps):
+            trace.record_many(step, vehicle=ids, x=x, y=y, speed=speed)
+            x = x + speed * delta_time
+            speed = np.clip(speed + 0.05 * (27.5 - speed) + rng.normal(0, 0.3, vehicles), 20, 35)
+    return path
+
+class MobilityTrace:
+    """Positions and speeds of every vehicle at every step of a vehicle trace, as (steps, vehicles) arrays.
+
+    Any trace written by TraceWriter works, e.g. one recorded by
+    record_mobility or by a script's --trace option, as long as every vehicle
+    has a row at every step.
+    """
+
+    def __init__(self, path, delta_time=DELTA_TIME):
+        columns = read_trace(path)
+        self.delta_time = delta_time
+        self.steps, step_index = np.unique(columns["step"], return_inverse=True)
+        self.vehicles, vehicle_index = np.unique(columns["vehicle"], return_inverse=True)
+        shape = (len(self.steps), len(self.vehicles))
+        if len(columns["step"]) != shape[0] * shape[1]:
+            raise ValueError(f"{path} does not have one row per vehicle and step")
+        self.x = np.full(shape, np.nan)
+        self.y = np.full(shape, np.nan)
+        self.speed = np.full(shape, np.nan)
+        self.x[step_index, vehicle_index] = columns["x"]
+        self.y[step_index, vehicle_index] = columns["y"]
+        self.speed[step_index, vehicle_index] = columns["speed"]
+
+    def __len__(self):
+        return len(self.steps)
+
+    def frames(self, every=1):
+        """Yield (step number, x, y, speed) lists for every every-th step."""
+        for k in range(0, len(self.steps), every):
+            yield k, self.x[k].tolist(), self.y[k].tolist(), self.speed[k].tolist()
+
+def replay_urllc(trace, seed=0):
+    """URLLC Platoon link exchanges (every follower with the vehicle ahead) at every traced step.
+
+    The platoon is ordered by traced position at the first step, front-most
+    vehicle (the leader) first, as Platoon expects. Positions and speeds come
+    from the trace at every step and are not re-derived: the speed adaptation
+    of Platoon.communicate is overwritten by the next traced step, so the
+    mobility stays the same for every protocol.
+    """
+    script = load_script("URLLC(s,l,r,ne,d).py")
+    order = np.argsort(-trace.x[0], kind="stable").tolist() if len(trace) else []  # Trace columns, leader first
+    vehicles = [script.Vehicle(id=int(trace.vehicles[k]), position=0.0, speed=0.0) for k in order]
+    platoon = script.Platoon(vehicles, channel=urllc_channel(np.random.default_rng(seed)), metrics=None)
+    for _, x, _, speed in trace.frames():
+        for vehicle, k in zip(vehicles, order):
+            vehicle.position = x[k]
+            vehicle.speed = speed[k]
+        platoon.communicate(trace.delta_time)
+    return {
+        "messages": platoon.total_communications,
+        "delivered": platoon.successful_communications,
+        "network_efficiency": platoon.calculate_efficiency(),
+    }
+
+def replay_gpsr(trace, every=10, seed=0):
+    """gpsrvp GPSR over its lossy channel from the first to the last vehicle, every every-th traced step."""
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    script.CLOCK = SimClock()
+    script.CHANNEL.reseed(seed)
+    vehicles = [script.Vehicle(int(v), (0.0, 0.0), 0.0) for v in trace.vehicles]
+    gpsr = script.GreedyPerimeterStatelessRouting()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _, x, y, speed in trace.frames(every):
+            for vehicle, px, py, v in zip(vehicles, x, y, speed):
+                vehicle.position = (px, py)
+                vehicle.speed = v
+            grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+            for vehicle in vehicles:
+                vehicle.update_neighbors(vehicles, grid)
+            gpsr.route(vehicles[0], vehicles[-1])
+    return {
+        "routes": len(range(0, len(trace), every)),
+        "messages": gpsr.total_messages,
+        "delivered": gpsr.successful_messages,
+        "reliability": gpsr.reliability.mean,
+        "latency": script.CLOCK.average_delay,
+        "network_efficiency": gpsr.successful_messages / gpsr.total_messages * 100 if gpsr.total_messages else 0.0,
+    }
+
+def replay_grp(trace, every=10, seed=0):
+    """grp greedy routing along the road (x only) from the first to the last vehicle, every every-th traced step."""
+    script = load_script("grp(s,l,r,ne,d).py")
+    random.seed(seed)  # grp vehicles draw their link latency and reliability when created
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        vehicles = [script.Vehicle(int(v), 0.0) for v in trace.vehicles]
+        delivered = hops = 0
+        for _, x, _, speed in trace.frames(every):
+            for vehicle, position, v in zip(vehicles, x, speed):
+                vehicle.position = position
+                vehicle.speed = v * 3.6  # grp speeds are in km/h
+            grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+            for vehicle in vehicles:
+                vehicle.update_neighbors(vehicles, grid)
+            result = BatchRouter(vehicles).route(0, len(vehicles) - 1)
+            if result.delivered:
+                delivered += 1
+                hops += result.hops
+    routes = len(range(0, len(trace), every))
+    return {
+        "routes": routes,
+        "delivered": delivered,
+        "delivery_ratio": delivered / routes if routes else 0.0,
+        "mean_hops": hops / delivered if delivered else 0.0,
+    }
+
+def replay_cv2x(trace, seed=0):
+    """cv2xvis communicate between every ordered pair of vehicles at every traced step."""
+    script = load_script("cv2xvis(s,l,r,ne,d).py")
+    random.seed(seed)
+    vehicles = [script.Vehicle(0.0, 0.0) for _ in trace.vehicles]
+    pairs = in_range = 0
+    latency = 0.0
+    for _, x, y, speed in trace.frames():
+        for vehicle, px, py, v in zip(vehicles, x, y, speed):
+            vehicle.x, vehicle.y, vehicle.speed = px, py, v
+        for vehicle in vehicles:
+            for other in vehicles:
+                if other is not vehicle:
+                    vehicle.communicate(other)
+                    pairs += 1
+                    in_range += vehicle.color == script.GREEN
+        latency += sum(vehicle.latency for vehicle in vehicles) / len(vehicles)
+    return {
+        "pairs": pairs,
+        "in_range": in_range,
+        "connectivity": in_range / pairs if pairs else 0.0,
+        "latency": latency / len(trace) if len(trace) else 0.0,  # Mean vehicle latency in ms
+    }
+
+# Protocol name -> replay driver taking (trace, seed=...)
+REPLAYS = {
+    "urllc": replay_urllc,
+    "gpsr": replay_gpsr,
+    "grp": replay_grp,
+    "cv2x": replay_cv2x,
+}
+
+def compare(trace, protocols=None, seed=0):
+    """Replay one mobility trace into each protocol and return their results and replay times."""
+    results = {}
+    for name in protocols or REPLAYS:
+        start = time.perf_counter()
+        results[name] = REPLAYS[name](trace, seed=seed)
+        results[name]["wall_time"] = time.perf_counter() - start
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a mobility trace once and replay it into every protocol")
+    parser.add_argument("trace", help="vehicle trace file to replay")
+    parser.add_argument("--record", action="store_true", help="record a new highway scenario to the trace file first")
+    parser.add_argument("--vehicles", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=600, help="0.1 s steps to record")
+    parser.add_argument("--lanes", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the recorded mobility and of the protocols' draws")
+    parser.add_argument("--protocols", nargs="+", choices=sorted(REPLAYS), default=None)
+    args = parser.parse_args()
+
+    if args.record:
+        start = time.perf_counter()
+        record_mobility(args.trace, args.vehicles, args.steps, lanes=args.lanes, seed=args.seed)
+        print(f"Recorded {args.vehicles} vehicles x {args.steps} steps in {time.perf_counter() - start:.3f} s")
+    trace = MobilityTrace(args.trace)
+    print(json.dumps(compare(trace, args.protocols, args.seed), indent=2))
+
+if __name__ == "__main__":
+    main()
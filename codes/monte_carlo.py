@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from script_loader import load_script
+from spatial_index import build_grid
+from routing_engine import BatchRouter, closest_to_sender
+from perimeter import PlanarGraph
+from sim_clock import SimClock
+
+METRICS = ("hops", "latency", "reliability", "network_efficiency")
+
+def path_metrics(senders, latency, reliability, efficiency):
+    """End-to-end metrics of a delivered route from per-sender values.
+
+    Latency adds up over the hops, reliability multiplies (every hop has to
+    succeed) and network efficiency is averaged over the senders.
+    """
+    if not senders:
+        return {"latency": 0.0, "reliability": 1.0, "network_efficiency": 0.0}
+    return {
+        "latency": sum(latency),
+        "reliability": math.prod(reliability),
+        "network_efficiency": sum(efficiency) / len(efficiency),
+    }
+
+def route_outcome(delivered, hops, metrics=None):
+    outcome = {"delivered": delivered, "hops": hops}
+    if delivered:
+        outcome.update(metrics or {})
+    return outcome
+
+def run_grp(num_vehicles=10, source=0, destination=9):
+    """simulate_grp of grp: vehicles on a straight road, greedy routing 0 -> 9."""
+    script = load_script("grp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, i * 8) for i in range(num_vehicles)]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    for vehicle in vehicles:
+        vehicle.update_neighbors(vehicles, grid)
+    result = BatchRouter(vehicles).route(source, destination)
+    senders = [vehicles[i] for i in result.path[:-1]]
+    return route_outcome(result.delivered, result.hops, path_metrics(
+        senders, [v.latency for v in senders], [v.reliability for v in senders],
+        [v.network_efficiency for v in senders]))
+
+def run_grpvp(num_vehicles=10, source=0, destination=5):
+    """simulate_grp of grpvp: vehicles scattered in a 20 x 20 area, routing 0 -> 5."""
+    script = load_script("grpvp(s,l,r,ne,d).py")
+    vehicles = [script.Vehicle(i, (random.uniform(0, 20), random.uniform(0, 20))) for i in range(num_vehicles)]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    for vehicle in vehicles:
+        vehicle.update_neighbors(vehicles, grid)
+    result = BatchRouter(vehicles, key=closest_to_sender).route(source, destination)
+    senders = [vehicles[i] for i in result.path[:-1]]
+    return route_outcome(result.delivered, result.hops, path_metrics(
+        senders, [v.latency for v in senders], [v.reliability for v in senders],
+        [v.network_efficiency for v in senders]))
+
+def run_gpsrvp(num_vehicles=10):
+    """simulate_gpsr of gpsrvp: a straight road with lossy links, routing first -> last."""
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    script.CLOCK = SimClock()  # Every replication starts at simulated time zero
+    script.CHANNEL.reseed()  # Link draws follow this replication's seed
+    vehicles = [script.Vehicle(i, (i * 10, 0), random.uniform(5, 15)) for i in range(num_vehicles)]
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    for vehicle in vehicles:
+        vehicle.update_neighbors(vehicles, grid)
+    gpsr = script.GreedyPerimeterStatelessRouting()
+    gpsr.route(vehicles[0], vehicles[-1])
+    if not gpsr.successful_messages:
+        return route_outcome(False, gpsr.total_messages)
+    return route_outcome(True, gpsr.total_messages, {
+        "latency": script.CLOCK.average_delay,
+        "reliability": gpsr.reliability.mean,
+        "network_efficiency": gpsr.successful_messages / gpsr.total_messages * 100,
+    })
+
+def run_gpsrvpvis(num_clusters=3, vehicles_per_cluster=5):
+    """simulate_gpsr of gpsrvpvis: clustered vehicles, GPSR with perimeter mode between the farthest pair."""
+    script = load_script("gpsrvpvis(s,l,r,ne,d).py")
+    vehicles = script.create_vehicle_cluster(num_clusters, vehicles_per_cluster)
+    grid = build_grid(vehicles, script.DISTANCE_THRESHOLD)
+    for vehicle in vehicles:
+        vehicle.update_neighbors(vehicles, grid)
+    sender, destination = script.find_farthest_vehicles(vehicles)
+    planar = PlanarGraph(vehicles, script.DISTANCE_THRESHOLD)
+    result = planar.route(planar.index_of(sender), planar.index_of(destination))
+    senders = [vehicles[i] for i in result.path[:-1]]
+    metrics = [v.calculate_metrics() for v in senders]
+    return route_outcome(result.delivered, result.hops, path_metrics(
+        senders, [m[0] for m in metrics], [m[1] for m in metrics], [m[2] for m in metrics]))
+
+def run_gspr(num_nodes=50, width=800, height=600, threshold=150):
+    """main of gspr without the window: random nodes, GPSR with perimeter mode 0 -> 9."""
+    script = load_script("gspr(s,l,r,ne,d).py")
+    nodes = script.create_nodes(num_nodes, width, height)
+    adjacency = script.connect_nodes_csr(nodes, threshold)
+    planar = PlanarGraph(nodes, threshold, adjacency)
+    source, destination = nodes[0], nodes[9]
+    path = script.gpsr_route(source, destination, nodes, planar=planar)
+    senders = path[:-1]
+    return route_outcome(path[-1] is destination, len(path) - 1, path_metrics(
+        senders, [n.latency for n in senders], [n.reliability for n in senders],
+        [n.network_efficiency for n in senders]))
+
+def run_gprvis(num_nodes=20, threshold=100):
+    """main of gprvis without the window: greedy routing of one packet between random nodes."""
+    script = load_script("gprvis(s,l,r,ne,d).py")
+    nodes = [script.Node(random.randint(50, 750), random.randint(50, 550), i) for i in range(num_nodes)]
+    adjacency = script.build_csr_adjacency([node.x for node in nodes], [node.y for node in nodes], threshold)
+    src = random.choice(nodes)
+    dest = random.choice(nodes)
+    while dest == src:
+        dest = random.choice(nodes)
+    packet = script.Packet(src, dest, "Hello!")
+    path = script.greedy_routing(src, dest, nodes, adjacency)
+    return route_outcome(path[-1] is dest, len(path) - 1, {
+        "latency": packet.latency,
+        "reliability": packet.reliability,
+        "network_efficiency": packet.network_efficiency,
+    })
+
+# Scenario name -> function running one replication and returning its outcome
+SCENARIOS = {
+    "grp": run_grp,
+    "grpvp": run_grpvp,
+    "gpsrvp": run_gpsrvp,
+    "gpsrvpvis": run_gpsrvpvis,
+    "gspr": run_gspr,
+    "gprvis": run_gprvis,
+}
+
+def replication_seeds(master_seed, runs):
+    """One independent seed per replication, derived from the master seed.
+
+    Replication i always gets the same seed whatever the number of runs or
+    workers, so any replication can be re-run on its own.
+    """
+    children = np.random.SeedSequence(master_seed).spawn(runs)
+    return [int.from_bytes(child.generate_state(2, dtype=np.uint32).tobytes(), "little") for child in children]
+
+def run_replications(scenario, seeds, params):
+    """Worker: run one chunk of replications, each on its own seed, with the scripts' prints discarded."""
+    run = SCENARIOS[scenario]
+    outcomes = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for seed in seeds:
+            random.seed(seed)
+            outcomes.append(run(**params))
+    return outcomes
+
+def aggregate(outcomes):
+    """Merge per-run outcomes into delivery ratio and mean/std/min/max of every metric.
+
+    Hops and path metrics are taken over delivered runs. The outcomes are
+    merged in replication order, so the result only depends on the seeds.
+    """
+    delivered = [o for o in outcomes if o["delivered"]]
+    summary = {
+        "runs": len(outcomes),
+        "delivered": len(delivered),
+        "delivery_ratio": len(delivered) / len(outcomes) if outcomes else 0.0,
+    }
+    for metric in METRICS:
+        values = [o[metric] for o in delivered]
+        if not values:
+            summary[metric] = None
+            continue
+        mean = math.fsum(values) / len(values)
+        variance = math.fsum((v - mean) ** 2 for v in values) / (len(values) - 1) if len(values) > 1 else 0.0
+        summary[metric] = {"mean": mean, "std": math.sqrt(variance), "min": min(values), "max": max(values)}
+    return summary
+
+def monte_carlo(scenario, runs, master_seed=0, workers=None, chunk_size=None, **params):
+    """Run independent replications of a scenario over a process pool and aggregate them.
+
+    Replications are split into chunks of consecutive seeds; the chunks come
+    back in order, so the aggregate is bit-identical for a given master seed
+    and does not depend on the number of workers.
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario!r}; choose from {', '.join(SCENARIOS)}")
+    seeds = replication_seeds(master_seed, runs)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(runs / (workers * 8)))  # A few chunks per worker to balance the load
+    chunks = [seeds[i:i + chunk_size] for i in range(0, runs, chunk_size)]
+
+    if workers == 1:
+        results = [run_replications(scenario, chunk, params) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_replications, [scenario] * len(chunks), chunks, [params] * len(chunks)))
+    summary = aggregate([outcome for chunk in results for outcome in chunk])
+    summary.update({"scenario": scenario, "master_seed": master_seed})
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo replications of the routing scenarios")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=1000, help="number of replications")
+    parser.add_argument("--master-seed", type=int, default=0, help="seed the replication seeds are derived from")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = monte_carlo(args.scenario, args.runs, args.master_seed, args.workers)
+    summary["wall_time"] = time.perf_counter() - start
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import argparse
+import heapq
+import json
+import math
+import random
+import time
+from collections import deque
+import numpy as np
+from routing_engine import BatchRouter, closest_to_destination, position_distance
+from channel_model import PathLossChannel, SPEED_OF_LIGHT
+from streaming_stats import Metric
+
+# Event kinds, in the order they run at equal times
+GENERATE = 0  # A flow emits its next packet at its source
+ARRIVE = 1  # A packet reaches a node (its source or the receiver of a hop)
+TRY = 2  # A node's transmitter tries to send the head of its queue
+TX_DONE = 3  # A transmission ends; the receiver gets it or the sender retries
+
+# Reasons a packet is dropped
+QUEUE_FULL = "queue_full"
+NO_ROUTE = "no_route"  # Greedy forwarding has no neighbor to forward to
+TTL = "ttl"  # More hops than max_hops (greedy loops end here)
+LINK_LOSS = "link_loss"  # Lost on a hop after every retry
+
+class Flow:
+    def __init__(self, source, destination, rate, start=0.0, stop=None, poisson=True):
+        self.source = source
+        self.destination = destination
+        self.rate = rate  # Packets per second
+        self.start = start
+        self.stop = stop
+        self.poisson = poisson  # Exponential gaps between packets, else constant bit rate
+        self.generated = 0
+        self.delivered = 0
+        self.dropped = 0
+
+class PacketNetwork:
+    """Packet-level discrete-event simulation of multi-hop forwarding between vehicles.
+
+    Events live in one heap of (time, kind, sequence, node, packet) tuples.
+    Every node has a FIFO transmit queue of queue_limit packets and a
+    transmitter that sends one packet at a time. A transmission occupies the
+    channel of the sender and all its neighbors for its airtime
+    (packet_bits / bitrate), and a node that finds its channel busy backs off
+    for a random number of slots, so neighbors contend for the medium. Next
+    hops come from the greedy rule of BatchRouter, memoized per
+    (node, destination). Each hop succeeds with the channel's reliability at
+    the link distance and is retried up to max_retries times.
+
+    The vehicles need position and neighbors, as for BatchRouter. Topology
+    is static during a run.
+    """
+
+    def __init__(self, vehicles, channel=None, key=closest_to_destination, bitrate=6e6, packet_bits=2400,
+                 queue_limit=50, max_retries=3, slot=13e-6, max_backoff=16, max_hops=None, rng=None):
+        self.router = BatchRouter(vehicles, key)
+        self.channel = channel if channel is not None else PathLossChannel()
+        self.airtime = packet_bits / bitrate
+        self.packet_bits = packet_bits
+        self.queue_limit = queue_limit
+        self.max_retries = max_retries
+        self.slot = slot
+        self.max_backoff = max_backoff
+        self.max_hops = max_hops if max_hops is not None else len(vehicles)
+        self.rng = rng  # Seeded from the random module on first use when None
+        self.uniforms = []
+        self.next_uniform = 0
+
+        n = len(vehicles)
+        self.queues = [deque() for _ in range(n)]
+        self.active = [False] * n  # A TRY or transmission is pending for the node
+        self.busy_until = [0.0] * n  # The node's channel is in use until then
+        self.next_hops = {}  # (node, destination) -> next hop or None
+        self.links = {}  # (node, next hop) -> (reliability, propagation delay)
+        self.flows = []
+        self.events = []
+        self.sequence = 0
+        self.now = 0.0
+
+        # Per-packet state, indexed by packet number
+        self.packet_flow = []
+        self.packet_created = []
+        self.packet_hops = []
+        self.packet_retries = []
+        self.packet_enqueued = []
+        self.packet_queue_delay = []
+
+        self.event_count = 0
+        self.generated = 0
+        self.delivered = 0
+        self.drops = {}
+        self.transmissions = 0
+        self.delay = Metric()  # End-to-end delay of delivered packets, and the delivery rate
+        self.queue_delay = Metric(window=None)  # Time delivered packets spent waiting in queues
+
+    def add_flow(self, source, destination, rate, start=0.0, stop=None, poisson=True):
+        """Send rate packets per second from vehicle index source to destination between start and stop."""
+        flow = Flow(source, destination, rate, start, stop, poisson)
+        self.flows.append(flow)
+        self.schedule(start, GENERATE, len(self.flows) - 1, -1)
+        return flow
+
+    def schedule(self, at, kind, node, packet):
+        self.sequence += 1
+        heapq.heappush(self.events, (at, kind, self.sequence, node, packet))
+
+    def uniform(self):
+        """Next U(0, 1) number, drawn from the generator in blocks."""
+        if self.next_uniform == len(self.uniforms):
+            if self.rng is None:
+                self.rng = np.random.default_rng(random.getrandbits(64))
+            self.uniforms = self.rng.random(65536).tolist()
+            self.next_uniform = 0
+        u = self.uniforms[self.next_uniform]
+        self.next_uniform += 1
+        return u
+
+    def next_hop(self, node, destination):
+        key = (node, destination)
+        if key not in self.next_hops:
+            self.next_hops[key] = self.router.next_hop(node, destination)
+        return self.next_hops[key]
+
+    def link(self, node, receiver):
+        """(reliability, propagation delay) of the hop node -> receiver."""
+        key = (node, receiver)
+        link = self.links.get(key)
+        if link is None:
+            distance = position_distance(self.router.positions[node], self.router.positions[receiver])
+            link = self.links[key] = (float(self.channel.reliability(np.array([distance]))[0]), distance / SPEED_OF_LIGHT)
+        return link
+
+    def drop(self, packet, reason):
+        """Count a lost packet by reason and against its flow."""
+        self.drops[reason] = self.drops.get(reason, 0) + 1
+        self.flows[self.packet_flow[packet]].dropped += 1
+
+    def run(self, until):
+        """Process events up to simulated time until and return stats()."""
+        events = self.events
+        pop = heapq.heappop
+        while events and events[0][0] <= until:
+            now, kind, _, node, packet = pop(events)
+            self.now = now
+            self.event_count += 1
+            if kind == ARRIVE:
+                self.arrive(node, packet)
+            elif kind == TRY:
+                self.try_send(node)
+            elif kind == TX_DONE:
+                self.transmission_done(node, packet)
+            else:
+                self.generate(node)
+        self.now = until
+        return self.stats()
+
+    def generate(self, flow_index):
+        flow = self.flows[flow_index]
+        now = self.now
+        if flow.stop is not None and now >= flow.stop:
+            return
+        packet = len(self.packet_flow)
+        self.packet_flow.append(flow_index)
+        self.packet_created.append(now)
+        self.packet_hops.append(0)
+        self.packet_retries.append(0)
+        self.packet_enqueued.append(now)
+        self.packet_queue_delay.append(0.0)
+        flow.generated += 1
+        self.generated += 1
+        self.arrive(flow.source, packet)
+        gap = -math.log1p(-self.uniform()) / flow.rate if flow.poisson else 1.0 / flow.rate
+        self.schedule(now + gap, GENERATE, flow_index, -1)
+
+    def arrive(self, node, packet):
+        flow = self.flows[self.packet_flow[packet]]
+        if node == flow.destination:
+            flow.delivered += 1
+            self.delivered += 1
+            self.delay.add(self.now - self.packet_created[packet], self.now)
+            self.queue_delay.add(self.packet_queue_delay[packet])
+            return
+        queue = self.queues[node]
+        if len(queue) >= self.queue_limit:
+            self.drop(packet, QUEUE_FULL)
+            return
+        self.packet_enqueued[packet] = self.now
+        queue.append(packet)
+        if not self.active[node]:
+            self.active[node] = True
+            self.try_send(node)
+
+    def try_send(self, node):
+        now = self.now
+        if self.busy_until[node] > now:  # Carrier sense: wait for the channel, then back off
+            backoff = int(self.uniform() * self.max_backoff) * self.slot
+            self.schedule(self.busy_until[node] + backoff, TRY, node, -1)
+            return
+        queue = self.queues[node]
+        while queue:
+            packet = queue[0]
+            destination = self.flows[self.packet_flow[packet]].destination
+            receiver = self.next_hop(node, destination)
+            if receiver is None or self.packet_hops[packet] >= self.max_hops:
+                queue.popleft()
+                self.drop(packet, NO_ROUTE if receiver is None else TTL)
+                continue
+            queue.popleft()
+            waited = now - self.packet_enqueued[packet]
+            self.packet_queue_delay[packet] += waited
+            end = now + self.airtime
+            busy_until = self.busy_until
+            busy_until[node] = end
+            for neighbor in self.router.neighbors[node]:
+                if busy_until[neighbor] < end:
+                    busy_until[neighbor] = end
+            self.transmissions += 1
+            self.schedule(end, TX_DONE, node, packet)
+            return
+        self.active[node] = False
+
+    def transmission_done(self, node, packet):
+        destination = self.flows[self.packet_flow[packet]].destination
+        receiver = self.next_hop(node, destination)
+        reliability, propagation = self.link(node, receiver)
+        if self.uniform() < reliability:
+            self.packet_hops[packet] += 1
+            self.packet_retries[packet] = 0
+            self.schedule(self.now + propagation, ARRIVE, receiver, packet)
+        elif self.packet_retries[packet] < self.max_retries:
+            self.packet_retries[packet] += 1
+            self.packet_enqueued[packet] = self.now
+            self.queues[node].appendleft(packet)  # Retransmit before anything else
+        else:
+            self.drop(packet, LINK_LOSS)
+        if self.queues[node]:
+            self.try_send(node)
+        else:
+            self.active[node] = False
+
+    def stats(self):
+        """Throughput, delays, drops and efficiency so far (packets still in flight count as neither)."""
+        elapsed = self.now or 1.0
+        delivered = self.delivered
+        return {
+            "simulated_time": self.now,
+            "events": self.event_count,
+            "generated": self.generated,
+            "delivered": delivered,
+            "dropped": sum(self.drops.values()),
+            "drops": dict(self.drops),
+            "in_flight": self.generated - delivered - sum(self.drops.values()),
+            "transmissions": self.transmissions,
+            "throughput_packets": delivered / elapsed,  # Per second
+            "throughput_bits": delivered * self.packet_bits / elapsed,
+            "delay": self.delay.summary(self.now),
+            "queue_delay": self.queue_delay.summary(),
+            "max_queue_delay": self.queue_delay.stats.max if self.queue_delay.stats.count else 0.0,  # Largest per-packet total of queue_delay
+            "network_efficiency": delivered / self.generated * 100 if self.generated else 0.0,
+        }
+
+def load_test(vehicles=200, flows=50, rate=20.0, until=10.0, spacing=8.0, seed=0):
+    """Random flows between the vehicles of a straight gpsrvp platoon, forwarded with its greedy rule."""
+    from script_loader import load_script
+    from spatial_index import build_grid
+    random.seed(seed)
+    script = load_script("gpsrvp(s,l,r,ne,d).py")
+    platoon = [script.Vehicle(i, (i * spacing, random.uniform(-2, 2)), 10) for i in range(vehicles)]
+    grid = build_grid(platoon, script.DISTANCE_THRESHOLD)
+    for vehicle in platoon:
+        vehicle.update_neighbors(platoon, grid)
+    network = PacketNetwork(platoon)
+    for _ in range(flows):
+        source, destination = random.sample(range(vehicles), 2)
+        network.add_flow(source, destination, rate, start=random.uniform(0, 1 / rate))
+    return network.run(until)
+
+def main():
+    parser = argparse.ArgumentParser(description="Packet-level load test of greedy forwarding")
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--flows", type=int, default=50, help="simultaneous flows between random vehicles")
+    parser.add_argument("--rate", type=float, default=20.0, help="packets per second per flow")
+    parser.add_argument("--until", type=float, default=10.0, help="simulated seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = load_test(args.vehicles, args.flows, args.rate, args.until, seed=args.seed)
+    stats["wall_time"] = time.perf_counter() - start
+    stats["events_per_second"] = stats["events"] / stats["wall_time"]
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
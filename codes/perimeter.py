@@ -0,0 +1,218 @@
+import itertools
+import math
+from spatial_index import SpatialGrid
+from routing_engine import RouteResult, DELIVERED, NO_NEIGHBORS, LOOP, MAX_HOPS, position_distance
+
+GREEDY = "greedy"
+PERIMETER = "perimeter"
+VERSIONS = itertools.count()  # Topology versions, unique across every PlanarGraph
+
+class PacketState:
+    """GPSR packet header: forwarding mode and the perimeter-mode bookkeeping."""
+
+    def __init__(self, ttl):
+        self.mode = GREEDY
+        self.lp = None  # Position where the packet entered perimeter mode
+        self.lf = None  # Point where the packet entered the current face
+        self.e0 = None  # First edge traversed on the current face
+        self.previous = None  # Vehicle the packet arrived from
+        self.ttl = ttl
+
+def segment_intersection(p1, p2, q1, q2):
+    """Return the point where segment p1-p2 properly crosses segment q1-q2, or None."""
+    rx, ry = p2[0] - p1[0], p2[1] - p1[1]
+    sx, sy = q2[0] - q1[0], q2[1] - q1[1]
+    denominator = rx * sy - ry * sx
+    if denominator == 0:
+        return None  # Parallel or collinear
+    qpx, qpy = q1[0] - p1[0], q1[1] - p1[1]
+    t = (qpx * sy - qpy * sx) / denominator
+    u = (qpx * ry - qpy * rx) / denominator
+    if 0 < t < 1 and 0 <= u <= 1:
+        return (p1[0] + t * rx, p1[1] + t * ry)
+    return None
+
+class PlanarGraph:
+    """Neighbor graph plus its Gabriel-graph planarization, kept up to date as vehicles move.
+
+    Edge (a, b) of the neighbor graph stays in the planar subgraph unless some
+    witness lies strictly inside the circle with diameter ab. A witness is
+    always a common neighbor of a and b, so when vehicles move only their own
+    edges and the edges between their old and new neighbors need re-checking.
+    An already built CSR adjacency of the same radius (adjacency.py) can be
+    given to seed the neighbor sets instead of finding them again.
+    """
+
+    def __init__(self, vehicles, radius, adjacency=None):
+        self.vehicles = list(vehicles)
+        self.radius = radius
+        self.slots = {id(v): i for i, v in enumerate(self.vehicles)}
+        self.positions = [v.position for v in self.vehicles]
+        self.grid = SpatialGrid(radius).build(self.vehicles)
+        if adjacency is not None:
+            self.neighbors = [set(adjacency.neighbors(i).tolist()) for i in range(len(self.vehicles))]
+        else:
+            self.neighbors = [self.find_neighbors(i) for i in range(len(self.vehicles))]
+        self.planar = [set() for _ in self.vehicles]
+        self.version = next(VERSIONS)  # Renewed whenever a neighbor or planar edge set changes
+        for a in range(len(self.vehicles)):
+            for b in self.neighbors[a]:
+                if a < b:
+                    self.check_edge(a, b)
+
+    def index_of(self, vehicle):
+        return self.slots[id(vehicle)]
+
+    def find_neighbors(self, i):
+        """Vehicles closer than radius to vehicle i, found through the grid."""
+        here = self.positions[i]
+        return {j for j in self.grid.nearby_indices(here)
+                if j != i and position_distance(here, self.positions[j]) < self.radius}
+
+    def is_gabriel_edge(self, a, b):
+        """True if no common neighbor of a and b lies inside the circle with diameter ab."""
+        (ax, ay), (bx, by) = self.positions[a], self.positions[b]
+        mx, my = (ax + bx) / 2, (ay + by) / 2
+        limit = ((ax - bx) ** 2 + (ay - by) ** 2) / 4
+        for w in self.neighbors[a] & self.neighbors[b]:
+            wx, wy = self.positions[w]
+            if (wx - mx) ** 2 + (wy - my) ** 2 < limit:
+                return False
+        return True
+
+    def check_edge(self, a, b):
+        """Add or remove edge (a, b) of the planar subgraph; True if that changed it."""
+        keep = b in self.neighbors[a] and self.is_gabriel_edge(a, b)
+        if keep == (b in self.planar[a]):
+            return False
+        if keep:
+            self.planar[a].add(b)
+            self.planar[b].add(a)
+        else:
+            self.planar[a].discard(b)
+            self.planar[b].discard(a)
+        return True
+
+    def update(self, moved):
+        """Bring both graphs up to date after the vehicles at the given indices moved."""
+        moved = set(moved)
+        changed = False
+        touched = {}  # moved vehicle -> its neighbors before and after the move
+        for i in moved:
+            old_position = self.positions[i]
+            self.positions[i] = self.vehicles[i].position
+            self.grid.move(i, old_position)
+        for i in moved:
+            touched[i] = set(self.neighbors[i])
+        for i in moved:
+            new_neighbors = self.find_neighbors(i)
+            changed |= new_neighbors != self.neighbors[i]
+            for j in self.neighbors[i] - new_neighbors:
+                self.neighbors[j].discard(i)
+            for j in new_neighbors - self.neighbors[i]:
+                self.neighbors[j].add(i)
+            self.neighbors[i] = new_neighbors
+            touched[i] |= new_neighbors
+
+        # Edges that lost their endpoint or whose witness set may have changed
+        edges = set()
+        for i, around in touched.items():
+            for j in around:
+                edges.add((min(i, j), max(i, j)))
+                for k in self.neighbors[j] & around:
+                    edges.add((min(j, k), max(j, k)))
+        for a, b in edges:
+            changed |= self.check_edge(a, b)
+        if changed:
+            self.version = next(VERSIONS)  # Routes cached for the old topology are no longer used
+
+    def packet(self):
+        """Start a new packet; the TTL bounds greedy plus face traversal on this graph."""
+        edges = sum(len(p) for p in self.planar)
+        return PacketState(ttl=2 * edges + 2 * len(self.vehicles))
+
+    def bearing(self, a, b):
+        (ax, ay), (bx, by) = self.positions[a], self.positions[b]
+        return math.atan2(by - ay, bx - ax)
+
+    def next_ccw(self, node, reference_bearing, exclude_zero=True):
+        """First planar neighbor of node counterclockwise from reference_bearing."""
+        best, best_turn = None, None
+        for n in sorted(self.planar[node]):
+            turn = (self.bearing(node, n) - reference_bearing) % (2 * math.pi)
+            if exclude_zero and turn == 0:
+                turn = 2 * math.pi  # The edge we arrived on is taken last
+            if best_turn is None or turn < best_turn:
+                best, best_turn = n, turn
+        return best
+
+    def face_change(self, current, nxt, destination, state):
+        """Apply the GPSR face-change rule to the edge current -> nxt."""
+        target = self.positions[destination]
+        for _ in range(len(self.planar[current])):
+            crossing = segment_intersection(self.positions[current], self.positions[nxt], state.lp, target)
+            if crossing is None or position_distance(crossing, target) >= position_distance(state.lf, target):
+                break
+            state.lf = crossing
+            nxt = self.next_ccw(current, self.bearing(current, nxt))
+            state.e0 = (current, nxt)
+        return nxt
+
+    def next_hop(self, current, destination, state):
+        """Pick the next vehicle index for a packet at current, or None if it cannot progress."""
+        if state.ttl <= 0:
+            return None
+        state.ttl -= 1
+        target = self.positions[destination]
+        here = position_distance(self.positions[current], target)
+
+        if state.mode == PERIMETER and here < position_distance(state.lp, target):
+            state.mode = GREEDY  # Closer than where perimeter mode started
+
+        if state.mode == GREEDY:
+            best = min(sorted(self.neighbors[current]), default=None,
+                       key=lambda n: position_distance(self.positions[n], target))
+            if best is not None and position_distance(self.positions[best], target) < here:
+                state.previous = current
+                return best
+            if not self.planar[current]:
+                return None
+            # Local minimum: enter perimeter mode on the first edge counterclockwise from the line to D
+            state.mode = PERIMETER
+            state.lp = state.lf = self.positions[current]
+            nxt = self.next_ccw(current, self.bearing(current, destination), exclude_zero=False)
+            state.e0 = (current, nxt)
+            nxt = self.face_change(current, nxt, destination, state)
+        else:
+            # Right-hand rule: first edge counterclockwise from the edge we arrived on
+            nxt = self.next_ccw(current, self.bearing(current, state.previous))
+            e0 = state.e0
+            nxt = self.face_change(current, nxt, destination, state)
+            if state.e0 == e0 and (current, nxt) == e0:
+                return None  # Walked the whole face without progress: destination unreachable
+        state.previous = current
+        return nxt
+
+    def route(self, source, destination, max_hops=None):
+        """Route one message between vehicle indices with greedy and perimeter forwarding."""
+        state = self.packet()
+        path = [source]
+        current = source
+        while current != destination:
+            if max_hops is not None and len(path) - 1 >= max_hops:
+                return RouteResult(source, destination, MAX_HOPS, len(path) - 1, path)
+            nxt = self.next_hop(current, destination, state)
+            if nxt is None:
+                reason = NO_NEIGHBORS if not self.neighbors[current] else LOOP
+                return RouteResult(source, destination, reason, len(path) - 1, path)
+            path.append(nxt)
+            current = nxt
+        return RouteResult(source, destination, DELIVERED, len(path) - 1, path)
+
+    def route_batch(self, pairs, max_hops=None, keep_paths=True):
+        """Route every (source, destination) index pair and return the results in input order."""
+        results = [self.route(source, destination, max_hops) for source, destination in pairs]
+        if not keep_paths:
+            for result in results:
+                result.path = None
+        return results
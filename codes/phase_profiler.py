@@ -0,0 +1,99 @@
+import atexit
+import sys
+import time
+
+class NullPhase:
+    """What phase() returns while profiling is off: entering and leaving it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_PHASE = NullPhase()
+
+class Phase:
+    """Wall time and call count of one named phase; re-entering it (recursion) is counted once."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.depth = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.start = time.perf_counter()
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            self.total += time.perf_counter() - self.start
+            self.calls += 1
+        return False
+
+class Profiler:
+    """Named phase timers and counters around the steps of a simulation loop.
+
+    Wrap each phase in `with PROFILER.phase("move"):` and count events with
+    PROFILER.count("messages"). While disabled, phase() hands out a shared
+    no-op context and count() returns at once, so the hooks can stay in the
+    hot loops. enable() starts the clock and prints a per-phase breakdown
+    when the process exits.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+        self.counters = {}
+        self.started = None
+        self.registered = False
+
+    def enable(self, report_at_exit=True):
+        self.enabled = True
+        self.started = time.perf_counter()
+        if report_at_exit and not self.registered:
+            atexit.register(self.print_report)
+            self.registered = True
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(name)
+        return phase
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """Wall time since enable() and, per phase, calls, total and mean seconds and share of the wall time."""
+        wall = time.perf_counter() - self.started if self.started is not None else 0.0
+        phases = {}
+        for phase in sorted(self.phases.values(), key=lambda p: p.total, reverse=True):
+            phases[phase.name] = {
+                "calls": phase.calls,
+                "total": phase.total,
+                "mean": phase.total / phase.calls if phase.calls else 0.0,
+                "share": phase.total / wall if wall else 0.0,
+            }
+        return {"wall_time": wall, "phases": phases, "counters": dict(self.counters)}
+
+    def print_report(self, file=None):
+        file = file or sys.stderr  # Keeps the breakdown out of the simulation's own output
+        report = self.report()
+        print(f"\nPhase breakdown over {report['wall_time']:.3f} s:", file=file)
+        print(f"  {'phase':<20} {'calls':>10} {'total s':>10} {'mean us':>10} {'share':>7}", file=file)
+        for name, phase in report["phases"].items():
+            print(f"  {name:<20} {phase['calls']:>10} {phase['total']:>10.3f} {phase['mean'] * 1e6:>10.1f} "
+                  f"{phase['share']:>6.1%}", file=file)
+        for name, value in report["counters"].items():
+            print(f"  {name:<20} {value:>10}", file=file)
+
+PROFILER = Profiler()  # Shared by the scripts; --profile turns it on
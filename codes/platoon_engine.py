@@ -0,0 +1,67 @@
+import numpy as np
+from channel_model import urllc_channel
+
+class PlatoonArrays:
+    """Struct-of-arrays version of the URLLC Platoon.
+
+    Positions, speeds, latencies and reliabilities are stored as
+    (num_platoons, vehicles_per_platoon) arrays and every platoon is advanced
+    in one vectorized step. Column 0 is the leader of each platoon; latency and
+    reliability of column i describe its link to the vehicle ahead (i - 1).
+    Links are drawn from channel (the URLLC path-loss channel by default).
+    """
+
+    def __init__(self, positions, speeds, seed=None, channel=None):
+        self.positions = np.array(positions, dtype=np.float64, ndmin=2)
+        self.speeds = np.array(speeds, dtype=np.float64, ndmin=2)
+        self.latencies = np.zeros_like(self.positions)
+        self.reliabilities = np.ones_like(self.positions)
+        self.rng = np.random.default_rng(seed)
+        self.channel = channel if channel is not None else urllc_channel(self.rng)
+        num_platoons = self.positions.shape[0]
+        self.total_communications = np.zeros(num_platoons, dtype=np.int64)  # Per platoon
+        self.successful_communications = np.zeros(num_platoons, dtype=np.int64)
+
+    @classmethod
+    def from_platoons(cls, platoons, seed=None):
+        """Copy the state of equally sized Platoon objects into one engine (with the first platoon's channel)."""
+        positions = [[v.position for v in platoon.vehicles] for platoon in platoons]
+        speeds = [[v.speed for v in platoon.vehicles] for platoon in platoons]
+        engine = cls(positions, speeds, seed, getattr(platoons[0], "channel", None))
+        engine.total_communications[:] = [p.total_communications for p in platoons]
+        engine.successful_communications[:] = [p.successful_communications for p in platoons]
+        return engine
+
+    @property
+    def vehicle_count(self):
+        return self.positions.size
+
+    def update(self, delta_time):
+        """Advance every platoon by one step with the same rules as Platoon.update."""
+        # Update the positions of all vehicles with their current speeds
+        self.positions += self.speeds * delta_time
+
+        # All vehicles except the leader communicate with the vehicle ahead
+        distance = np.abs(self.positions[:, 1:] - self.positions[:, :-1])
+        links = distance.shape
+        latency, reliability, success = self.channel.sample(distance)
+        self.latencies[:, 1:] = latency  # Seconds
+        self.reliabilities[:, 1:] = reliability
+        self.total_communications += links[1]
+
+        # Adjust speed based on the distance to the vehicle ahead
+        self.speeds[:, 1:] -= 0.5 * (distance < 10)  # If too close, slow down
+        self.speeds[:, 1:] += 0.5 * (distance > 20)  # If too far, speed up
+
+        # Success was drawn by the channel from each link's reliability
+        self.successful_communications += success.sum(axis=1)
+
+    def run(self, delta_time, steps):
+        """Advance every platoon by a number of steps."""
+        for _ in range(steps):
+            self.update(delta_time)
+
+    def calculate_efficiency(self):
+        """Return the network efficiency (%) of each platoon."""
+        total = np.maximum(self.total_communications, 1)
+        return np.where(self.total_communications > 0, self.successful_communications / total * 100, 0.0)
@@ -0,0 +1,209 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import time
+import numpy as np
+from script_loader import load_script
+from channel_model import urllc_channel
+from platoon_engine import PlatoonArrays
+from checkpoint import Checkpointer, CheckpointError, load as load_checkpoint
+
+PLATOON_SPACING = 1000.0  # Meters between the leaders of consecutive platoons on the corridor
+ENGINES = ("objects", "arrays")  # Platoon.update per platoon, or one PlatoonArrays per shard
+
+def build_platoon(script, index, vehicles_per_platoon, master_seed):
+    """Platoon number index of the corridor, built the same way in any worker.
+
+    Like simulate_platoon of URLLC: a leader at 30 m/s and followers 15 m
+    apart, with follower speeds drawn between 27 and 30 m/s. Each platoon has
+    its own generator for speeds and channel, seeded from (master_seed,
+    index), so a run gives the same counters for any number of workers.
+    """
+    rng = np.random.default_rng([master_seed, index])
+    start = index * PLATOON_SPACING
+    vehicles = [script.Vehicle(id=1, position=start, speed=30)]  # Leader
+    for i in range(1, vehicles_per_platoon):
+        vehicles.append(script.Vehicle(id=i + 1, position=start + i * 15, speed=float(rng.uniform(27, 30))))
+    return script.Platoon(vehicles, channel=urllc_channel(rng), metrics=None)  # Only counters leave the worker
+
+def advance(platoons, steps, delta_time):
+    """Step a shard (a list of Platoon objects or one PlatoonArrays) and return its (total, successful) communications."""
+    if isinstance(platoons, PlatoonArrays):
+        platoons.run(delta_time, steps)
+        return int(platoons.total_communications.sum()), int(platoons.successful_communications.sum())
+    for platoon in platoons:
+        for _ in range(steps):
+            platoon.update(delta_time)
+    return sum(p.total_communications for p in platoons), sum(p.successful_communications for p in platoons)
+
+def step_shard(indices, vehicles_per_platoon, master_seed, intervals, steps_per_interval, delta_time,
+               engine="objects", checkpoint=None, checkpoint_every=1):
+    """Build the platoons of a shard and yield its (total, successful) communications per reporting interval.
+
+    The "objects" engine steps every Platoon with Platoon.update. The "arrays"
+    engine copies the shard into one PlatoonArrays and steps all its platoons
+    in one vectorized update with the same rules; its links are drawn from
+    the shard's first channel, so its counters depend on the number of
+    workers.
+
+    With a checkpoint file the shard saves its platoons (vehicles, channel
+    generator states and counters) and the counters it has reported every
+    checkpoint_every intervals. If the file exists the shard resumes from it:
+    it yields the saved counters again and then continues bit-identically.
+    """
+    script = load_script("URLLC(s,l,r,ne,d).py")  # Before loading: the saved vehicles are instances of its classes
+    settings = (indices.start, indices.stop, vehicles_per_platoon, master_seed, steps_per_interval, delta_time, engine)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        state = load_checkpoint(checkpoint)
+        if state["settings"] != settings:
+            raise CheckpointError(f"{checkpoint} was saved by a different corridor run or number of workers")
+        platoons, reports = state["platoons"], state["reports"]
+    else:
+        platoons = [build_platoon(script, i, vehicles_per_platoon, master_seed) for i in indices]
+        if engine == "arrays":
+            platoons = PlatoonArrays.from_platoons(platoons)
+        reports = []
+    yield from reports[:intervals]
+    checkpointer = Checkpointer(checkpoint) if checkpoint is not None else None
+    try:
+        for interval in range(len(reports), intervals):
+            reports.append(advance(platoons, steps_per_interval, delta_time))
+            if checkpointer is not None and ((interval + 1) % checkpoint_every == 0 or interval + 1 == intervals):
+                checkpointer.save({"settings": settings, "platoons": platoons, "reports": reports})
+            yield reports[-1]
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+
+def shard_checkpoint(checkpoint_dir, shard):
+    return os.path.join(checkpoint_dir, f"shard-{shard}.ckpt") if checkpoint_dir else None
+
+def shard_worker(shard, indices, args, checkpoint_dir, checkpoint_every, reports):
+    """Process entry point: step one shard and put only its counters on the reports queue."""
+    shard_args = args + (shard_checkpoint(checkpoint_dir, shard), checkpoint_every)
+    for interval, counters in enumerate(step_shard(indices, *shard_args)):
+        reports.put((shard, interval, counters))
+
+def shard_indices(platoons, workers):
+    """Split platoon indices 0..platoons-1 into workers contiguous ranges of (almost) equal size."""
+    return [range(k * platoons // workers, (k + 1) * platoons // workers) for k in range(workers)]
+
+def worker_count(platoons, workers=None):
+    """Worker processes a corridor run actually starts: the requested number (default: all cores), at most one per platoon."""
+    return max(1, min(workers or os.cpu_count() or 1, platoons))
+
+def run_corridor(platoons=1000, vehicles_per_platoon=4, intervals=10, steps_per_interval=10, delta_time=0.1,
+                 master_seed=0, workers=None, report=None, checkpoint_dir=None, checkpoint_every=1, engine="objects"):
+    """Step independent platoons in worker processes and gather corridor-wide counters per interval.
+
+    Every worker builds and steps its own shard with the given engine (see
+    step_shard) and sends
+    back only its cumulative total and successful communication counts after
+    each interval of steps_per_interval steps. report(interval, totals) is
+    called as soon as every shard has finished an interval. Returns the list
+    of per-interval totals.
+
+    With a checkpoint_dir every shard checkpoints to its own file there every
+    checkpoint_every intervals, and a run with the same arguments (and number
+    of workers) resumes from those files after a crash. Pass more intervals
+    to extend a finished run.
+    """
+    workers = worker_count(platoons, workers)
+    shards = shard_indices(platoons, workers)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    args = (vehicles_per_platoon, master_seed, intervals, steps_per_interval, delta_time, engine)
+    results = []
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def gather(interval, counters):
+        total = sum(c[0] for c in counters)
+        successful = sum(c[1] for c in counters)
+        totals = {
+            "interval": interval,
+            "simulated_time": (interval + 1) * steps_per_interval * delta_time,
+            "total_communications": total,
+            "successful_communications": successful,
+            "efficiency": successful / total * 100 if total else 0.0,
+        }
+        results.append(totals)
+        if report is not None:
+            report(interval, totals)
+
+    if workers == 1:
+        for interval, counters in enumerate(step_shard(shards[0], *args, shard_checkpoint(checkpoint_dir, 0), checkpoint_every)):
+            gather(interval, [counters])
+        return results
+
+    reports = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=shard_worker, args=(k, shard, args, checkpoint_dir, checkpoint_every, reports),
+                                         daemon=True)
+                 for k, shard in enumerate(shards)]
+    for process in processes:
+        process.start()
+    pending = {}  # Interval -> {shard: counters}, until every shard has reported it
+    try:
+        for _ in range(intervals * workers):
+            while True:
+                try:
+                    shard, interval, counters = reports.get(timeout=1)
+                    break
+                except queue.Empty:
+                    failed = [k for k, process in enumerate(processes) if process.exitcode not in (None, 0)]
+                    if failed:
+                        raise RuntimeError(f"Shard worker(s) {failed} exited with an error")
+            pending.setdefault(interval, {})[shard] = counters
+            while len(results) < intervals and len(pending.get(len(results), ())) == workers:
+                gather(len(results), list(pending.pop(len(results)).values()))
+    finally:
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Many independent URLLC platoons stepped in parallel shards")
+    parser.add_argument("--platoons", type=int, default=1000)
+    parser.add_argument("--vehicles", type=int, default=4, help="vehicles per platoon")
+    parser.add_argument("--intervals", type=int, default=10, help="reporting intervals")
+    parser.add_argument("--steps-per-interval", type=int, default=10, help="0.1 s steps per reporting interval")
+    parser.add_argument("--master-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="also write the summary to this JSON file")
+    parser.add_argument("--checkpoint-dir", default=None, help="checkpoint the shards here and resume from it")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="reporting intervals between checkpoints")
+    parser.add_argument("--engine", choices=ENGINES, default="objects",
+                        help="step Platoon objects one by one, or each shard as one vectorized PlatoonArrays")
+    args = parser.parse_args()
+
+    def report(interval, totals):
+        print(f"t={totals['simulated_time']:.1f} s: Network Efficiency: {totals['efficiency']:.2f}% "
+              f"(Total Communications: {totals['total_communications']}, "
+              f"Successful Communications: {totals['successful_communications']})")
+
+    start = time.perf_counter()
+    intervals = run_corridor(args.platoons, args.vehicles, args.intervals, args.steps_per_interval,
+                             master_seed=args.master_seed, workers=args.workers, report=report,
+                             checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every, engine=args.engine)
+    wall_time = time.perf_counter() - start
+    summary = {
+        "platoons": args.platoons,
+        "vehicles_per_platoon": args.vehicles,
+        "workers": worker_count(args.platoons, args.workers),
+        "engine": args.engine,
+        "intervals": intervals,
+        "wall_time": wall_time,
+        "platoon_steps_per_second": args.platoons * args.intervals * args.steps_per_interval / wall_time,
+        "vehicle_steps_per_second": args.platoons * args.vehicles * args.intervals * args.steps_per_interval / wall_time,
+    }
+    print(json.dumps({k: v for k, v in summary.items() if k != "intervals"}, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+import pygame
+
+_fonts = {}
+
+def get_font(name=None, size=24, system=False):
+    """Load a font once: pygame.font.SysFont(name, size) when system, else pygame.font.Font(name, size)."""
+    key = (name, size, system)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size) if system else pygame.font.Font(name, size)
+    return font
+
+class TextCache:
+    """Memoized font.render results keyed by text, antialiasing and colors (LRU above max_entries)."""
+
+    def __init__(self, font, max_entries=4096):
+        self.font = font
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+    def render(self, text, antialias, color, background=None):
+        key = (text, antialias, color, background)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.surfaces[key] = self.font.render(text, antialias, color, background)
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class StaticLayer:
+    """Content that does not change between frames (road, topology, labels), rendered once off-screen.
+
+    draw(surface) paints the layer; it runs again only after invalidate().
+    """
+
+    def __init__(self, size, draw):
+        self.size = size
+        self.draw = draw
+        self.surface = None
+
+    def invalidate(self):
+        self.surface = None
+
+    def get(self):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.size)
+            if pygame.display.get_surface() is not None:
+                self.surface = self.surface.convert()  # Same pixel format as the window: faster blits
+            self.draw(self.surface)
+        return self.surface
+
+class LayeredRenderer:
+    """Static background plus moving content, presented with dirty rectangles.
+
+    Each frame begin_frame() restores the background where things were drawn
+    last frame, the caller draws the moving content and mark()s the rects
+    that pygame.draw / blit return, and present() sends only those regions
+    to the display. The first frame (and any frame after invalidate()) is
+    drawn and flipped in full.
+    """
+
+    def __init__(self, screen, draw_static):
+        self.screen = screen
+        self.background = StaticLayer(screen.get_size(), draw_static)
+        self.bounds = screen.get_rect()
+        self.drawn = []  # Rects drawn since the last begin_frame, erased at the next one
+        self.pending = []  # Rects not yet sent to the display
+        self.full = True
+
+    def invalidate(self):
+        """Redraw the static layer and the whole window on the next frame."""
+        self.background.invalidate()
+        self.full = True
+
+    def begin_frame(self):
+        background = self.background.get()
+        if self.full:
+            self.screen.blit(background, (0, 0))
+        else:
+            for rect in self.drawn:
+                self.screen.blit(background, rect, rect)
+            self.pending.extend(self.drawn)
+        self.drawn = []
+
+    def mark(self, rect):
+        """Record a region drawn this frame; returns it for chaining."""
+        rect = pygame.Rect(rect).clip(self.bounds)
+        if rect.width and rect.height:
+            self.drawn.append(rect)
+            self.pending.append(rect)
+        return rect
+
+    def blit(self, surface, dest):
+        """Blit a moving sprite and mark its rect."""
+        return self.mark(self.screen.blit(surface, dest))
+
+    def present(self):
+        """Send the changed regions to the display (everything on a full frame)."""
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        elif self.pending:
+            pygame.display.update(self.pending)
+        self.pending = []
@@ -0,0 +1,68 @@
+import numpy as np
+
+def bezier_points(control_points, samples=100):
+    """samples + 1 points of a cubic Bezier curve at t = 0, 1/samples, ..., 1."""
+    (p0, p1, p2, p3) = np.asarray(control_points, dtype=float)
+    t = (np.arange(samples + 1) / samples)[:, None]
+    return (1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * p1 + 3 * (1 - t) * t ** 2 * p2 + t ** 3 * p3
+
+class RoadPath:
+    """Polyline road parameterized by arc length.
+
+    Cumulative arc length and segment headings are computed once. The position
+    and heading at arc length s come from a binary search over the cumulative
+    lengths, so a vehicle never overshoots or drifts off the road however fast
+    it goes, and whole fleets are placed with one vectorized call.
+    """
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=float)
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)  # Drop repeated points (curve joins)
+        self.xy = points[keep]
+        deltas = np.diff(self.xy, axis=0)
+        self.segment_lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self.headings = np.degrees(np.arctan2(deltas[:, 1], deltas[:, 0]))  # Degrees, like Vehicle.angle
+        self.length = float(self.cumulative[-1])
+
+    @classmethod
+    def from_bezier(cls, control_points_set, samples=100):
+        """Road made of consecutive cubic Bezier curves, each sampled at samples + 1 points."""
+        return cls(np.concatenate([bezier_points(c, samples) for c in control_points_set]))
+
+    def points(self):
+        """Road points as a list of (x, y) tuples, for pygame.draw.lines."""
+        return [tuple(p) for p in self.xy.tolist()]
+
+    def locate(self, s):
+        """Positions and headings at arc lengths s (array or scalar, clamped to the road)."""
+        s = np.clip(s, 0.0, self.length)
+        segment = np.clip(np.searchsorted(self.cumulative, s, side="right") - 1, 0, len(self.segment_lengths) - 1)
+        fraction = (s - self.cumulative[segment]) / self.segment_lengths[segment]
+        start = self.xy[segment]
+        end = self.xy[segment + 1]
+        x = start[..., 0] + (end[..., 0] - start[..., 0]) * fraction
+        y = start[..., 1] + (end[..., 1] - start[..., 1]) * fraction
+        return x, y, self.headings[segment]
+
+    def at(self, s):
+        """Position and heading (x, y, degrees) at a single arc length s."""
+        x, y, heading = self.locate(s)
+        return float(x), float(y), float(heading)
+
+    def advance(self, s, distances):
+        """Arc lengths after moving distances along the road, stopping at its end."""
+        return np.minimum(np.asarray(s, dtype=float) + distances, self.length)
+
+def follow_road(road, vehicles):
+    """Advance every vehicle by its speed along the road in one batched call.
+
+    Vehicles need s (arc length travelled), speed, x, y and angle attributes.
+    """
+    if not vehicles:
+        return
+    s = road.advance([v.s for v in vehicles], [v.speed for v in vehicles])
+    xs, ys, headings = road.locate(s)
+    for vehicle, s_, x, y, heading in zip(vehicles, s.tolist(), xs.tolist(), ys.tolist(), headings.tolist()):
+        vehicle.s, vehicle.x, vehicle.y, vehicle.angle = s_, x, y, heading
@@ -0,0 +1,201 @@
+import math
+import numbers
+from collections import OrderedDict
+
+# Reasons a route can end with
+DELIVERED = "delivered"
+NO_NEIGHBORS = "no_neighbors"  # Dead end: the current vehicle has nobody to forward to
+LOOP = "loop"  # Greedy forwarding picked a vehicle that was already visited
+MAX_HOPS = "max_hops"
+
+def position_distance(p, q):
+    """Distance between two positions, either (x, y) tuples or numbers on a straight road."""
+    if isinstance(p, numbers.Real):
+        return abs(p - q)
+    return math.sqrt((p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2)
+
+def closest_to_destination(current, candidate, destination):
+    """Greedy GRP/GPSR rule: forward to the neighbor closest to the destination."""
+    return position_distance(candidate, destination)
+
+def closest_to_sender(current, candidate, destination):
+    """Forward to the neighbor closest to the current vehicle (grpvp rule)."""
+    return position_distance(current, candidate)
+
+class RouteResult:
+    def __init__(self, source, destination, reason, hops, path=None):
+        self.source = source
+        self.destination = destination
+        self.reason = reason
+        self.hops = hops
+        self.path = path  # Vehicle indices visited, starting with the source (None if not kept)
+
+    @property
+    def delivered(self):
+        return self.reason == DELIVERED
+
+class BatchRouter:
+    """Iterative greedy router for many (source, destination) pairs.
+
+    The neighbor lists of the vehicles are converted once into index lists and
+    shared by every route. For each destination the router caches next-hop
+    choices and the outcome of every route that ended in delivery or a dead
+    end, so pairs sharing a destination only walk the part of the path nobody
+    has walked yet. Nothing is printed.
+    """
+
+    def __init__(self, vehicles, key=closest_to_destination):
+        self.vehicles = vehicles
+        self.key = key
+        slot = {id(v): i for i, v in enumerate(vehicles)}
+        self.positions = [v.position for v in vehicles]
+        self.neighbors = [[slot[id(n)] for n in v.neighbors if n is not v] for v in vehicles]
+
+    def next_hop(self, current, destination):
+        """Return the neighbor index chosen at current, or None if there is none."""
+        neighbors = self.neighbors[current]
+        if not neighbors:
+            return None
+        here = self.positions[current]
+        target = self.positions[destination]
+        return min(neighbors, key=lambda n: self.key(here, self.positions[n], target))
+
+    def route(self, source, destination, max_hops=None, keep_path=True, cache=None):
+        """Route one message and return a RouteResult (source and destination are indices).
+
+        cache is a (next_hops, outcomes) pair of dicts that is only valid for
+        this destination; route_batch passes one per destination.
+        """
+        next_hops, outcomes = cache if cache is not None else ({}, {})
+        walk = [source]
+        visited = {source}
+        current = source
+        while True:
+            if current == destination:
+                reason, tail = DELIVERED, 0
+                break
+            known = outcomes.get(current)
+            if known is not None:
+                reason, tail = known  # The rest of this route was already walked
+                break
+            nxt = next_hops.get(current, -1)
+            if nxt == -1:
+                nxt = next_hops[current] = self.next_hop(current, destination)
+            if nxt is None:
+                reason, tail = NO_NEIGHBORS, 0
+                break
+            if nxt in visited:
+                reason, tail = LOOP, 0
+                break
+            visited.add(nxt)
+            walk.append(nxt)
+            current = nxt
+
+        hops = len(walk) - 1 + tail
+        if reason != LOOP:
+            # Loop lengths depend on where the walk started, every other outcome is shared
+            for k, node in enumerate(walk):
+                outcomes[node] = (reason, hops - k)
+
+        path = None
+        if keep_path:
+            path = walk
+            for _ in range(tail):
+                path.append(next_hops[path[-1]])
+        if max_hops is not None and hops > max_hops:
+            reason, hops = MAX_HOPS, max_hops
+            if path is not None:
+                del path[max_hops + 1:]
+        return RouteResult(source, destination, reason, hops, path)
+
+    def route_batch(self, pairs, max_hops=None, keep_paths=True):
+        """Route every (source, destination) pair and return the results in input order."""
+        pairs = list(pairs)
+        results = [None] * len(pairs)
+        # Group pairs by destination so the caches stay O(n)
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i][1])
+        cache = None
+        last_destination = None
+        for i in order:
+            source, destination = pairs[i]
+            if destination != last_destination:
+                cache = ({}, {})
+                last_destination = destination
+            results[i] = self.route(source, destination, max_hops, keep_paths, cache)
+        return results
+
+class RouteCache:
+    """LRU cache of routes keyed by (source, destination, topology version).
+
+    Callers pass the version of the topology a route was computed on, so
+    routes stay valid until a neighbor set actually changes and routing work
+    follows topology churn instead of how often a route is asked for. Entries
+    of old versions are never hit again and age out. The memory cap is the
+    total number of path entries stored; least recently used routes go first.
+    """
+
+    def __init__(self, max_size=1_000_000):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used), or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size=1):
+        """Store value under key, evicting least recently used entries above the cap."""
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size and len(self.entries) > 1:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def route_batch(self, router, pairs, version, max_hops=None, keep_paths=True):
+        """Route (source, destination) pairs through the cache; only misses reach router.route_batch.
+
+        router is built lazily by calling it, so cache hits skip building it too.
+        Routes are always cached with their paths; keep_paths=False only drops
+        them from the results returned.
+        """
+        pairs = list(pairs)
+        results = [None] * len(pairs)
+        missing = []
+        for i, (source, destination) in enumerate(pairs):
+            results[i] = self.get((source, destination, version, max_hops))
+            if results[i] is None:
+                missing.append(i)
+        if missing:
+            computed = router().route_batch([pairs[i] for i in missing], max_hops=max_hops)
+            for i, result in zip(missing, computed):
+                source, destination = pairs[i]
+                self.put((source, destination, version, max_hops), result, len(result.path or ()) + 1)
+                results[i] = result
+        if not keep_paths:
+            results = [RouteResult(r.source, r.destination, r.reason, r.hops) for r in results]
+        return results
+
+def summarize(results):
+    """Aggregate delivery ratio, mean hop count of delivered routes and failure counts."""
+    delivered = [r for r in results if r.delivered]
+    failures = {}
+    for r in results:
+        if not r.delivered:
+            failures[r.reason] = failures.get(r.reason, 0) + 1
+    return {
+        "routes": len(results),
+        "delivery_ratio": len(delivered) / len(results) if results else 0.0,
+        "mean_hops": sum(r.hops for r in delivered) / len(delivered) if delivered else 0.0,
+        "failures": failures,
+    }
@@ -0,0 +1,42 @@
+import importlib.util
+import os
+import re
+import sys
+
+CODES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def module_name(filename):
+    """Turn a script file name such as 'grp(s,l,r,ne,d).py' into a valid module name."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return "script_" + re.sub(r"\W+", "_", stem).strip("_")
+
+def load_script(filename):
+    """Import one of the simulation scripts by file name and return the module.
+
+    The scripts' file names are not valid module names, so they cannot be
+    imported with an import statement. Visualizers that open a window at import
+    time get SDL's dummy video driver, and the scripts' own command line parsing
+    sees no arguments. Each script is only loaded once per process.
+    """
+    name = module_name(filename)
+    if name in sys.modules:
+        return sys.modules[name]
+    if CODES_DIR not in sys.path:
+        sys.path.insert(0, CODES_DIR)  # The scripts import the shared modules next to them
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+    spec = importlib.util.spec_from_file_location(name, os.path.join(CODES_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    argv = sys.argv
+    sys.argv = [spec.origin]
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    finally:
+        sys.argv = argv
+    return module
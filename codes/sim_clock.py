@@ -0,0 +1,56 @@
+import time
+
+class Message:
+    """End-to-end bookkeeping for one message travelling over one or more hops."""
+
+    def __init__(self, sent_at=0.0):
+        self.sent_at = sent_at
+        self.delay = 0.0  # Sum of the latencies of every hop so far
+        self.hops = 0
+
+class SimClock:
+    """Virtual simulation clock.
+
+    Sampled latencies and time steps advance simulated time instead of
+    blocking the process. With a real_time_factor the clock also paces the
+    wall clock (1.0 = real time, 2.0 = twice as fast) for demos; without one
+    the simulation runs as fast as it can.
+    """
+
+    def __init__(self, real_time_factor=None):
+        self.now = 0.0
+        self.real_time_factor = real_time_factor or None
+        self.wall_start = time.perf_counter()
+        self.hops = 0  # Single-hop transmissions sent through the clock
+        self.delivered_messages = 0
+        self.total_delay = 0.0  # End-to-end delay of all delivered messages
+
+    def advance(self, seconds):
+        """Move simulated time forward, sleeping only when pacing to a real-time factor."""
+        self.now += seconds
+        if self.real_time_factor is not None:
+            target = self.wall_start + self.now / self.real_time_factor
+            remaining = target - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def message(self):
+        """Start a new message at the current simulated time."""
+        return Message(self.now)
+
+    def send(self, latency, message=None):
+        """Transmit one hop that takes latency seconds."""
+        self.hops += 1
+        if message is not None:
+            message.delay += latency
+            message.hops += 1
+        self.advance(latency)
+
+    def deliver(self, message):
+        """Record a message that reached its destination."""
+        self.delivered_messages += 1
+        self.total_delay += message.delay
+
+    @property
+    def average_delay(self):
+        return self.total_delay / self.delivered_messages if self.delivered_messages else 0.0
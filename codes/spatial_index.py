@@ -0,0 +1,124 @@
+import math
+import numbers
+from bisect import bisect_left, bisect_right
+
+class SpatialGrid:
+    """Uniform grid (cell list) for answering "who is within range of me" queries.
+
+    The cell size is the communication threshold, so every vehicle closer than
+    the threshold lies in the same cell or one of the cells next to it.
+    Positions may be (x, y) tuples or plain numbers for straight-road models.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> list of indices into self.vehicles
+        self.vehicles = []
+
+    def cell_of(self, position):
+        """Return the grid cell that contains a position."""
+        if isinstance(position, numbers.Real):
+            return (math.floor(position / self.cell_size), 0)
+        return (math.floor(position[0] / self.cell_size), math.floor(position[1] / self.cell_size))
+
+    def build(self, vehicles):
+        """Bucket every vehicle into its cell. Costs O(n)."""
+        self.vehicles = list(vehicles)
+        self.cells = {}
+        for i, vehicle in enumerate(self.vehicles):
+            self.cells.setdefault(self.cell_of(vehicle.position), []).append(i)
+        return self
+
+    def move(self, index, old_position):
+        """Re-bucket vehicle number index after its position changed from old_position."""
+        old_cell = self.cell_of(old_position)
+        new_cell = self.cell_of(self.vehicles[index].position)
+        if old_cell != new_cell:
+            bucket = self.cells[old_cell]
+            bucket.remove(index)
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(new_cell, []).append(index)
+
+    def nearby_indices(self, position):
+        """Return the sorted indices of the vehicles in the 3x3 block of cells around a position."""
+        cx, cy = self.cell_of(position)
+        indices = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                indices.extend(self.cells.get((cx + dx, cy + dy), ()))
+        indices.sort()
+        return indices
+
+    def nearby(self, vehicle):
+        """Return the vehicles in the 3x3 block of cells around a vehicle.
+
+        Candidates come back in the order they were passed to build(), so
+        filtering them with the model's own distance check gives exactly the
+        same neighbor list as scanning the whole fleet.
+        """
+        return [self.vehicles[i] for i in self.nearby_indices(vehicle.position)]
+
+def build_grid(vehicles, threshold):
+    """Create a grid for a fleet keyed by its neighbor distance threshold."""
+    return SpatialGrid(threshold).build(vehicles)
+
+class RoadIndex:
+    """Sorted index of positions along a straight road for range and nearest-vehicle queries.
+
+    The order is re-sorted from the current positions at most once per tick
+    (the order of the last tick is nearly sorted already, so this is close to
+    linear) and queries bisect it, so a fan-out costs O(log n + k) instead of
+    a scan of the whole fleet. Objects may keep moving between refreshes by up
+    to slack; queries widen by slack and then check the current positions, so
+    the answers are exact.
+    """
+
+    def __init__(self, objects, slack=0.0):
+        self.objects = list(objects)
+        self.slack = slack
+        self.order = list(range(len(self.objects)))  # Indices into self.objects, sorted by position
+        self.positions = []
+        self.stamp = None
+        self.refresh()
+
+    def refresh(self, stamp=None):
+        """Re-sort by the current positions."""
+        objects = self.objects
+        self.order.sort(key=lambda i: objects[i].position)
+        self.positions = [objects[i].position for i in self.order]
+        self.stamp = stamp
+
+    def at(self, stamp):
+        """Return the index, refreshing it on the first query of a new tick."""
+        if stamp != self.stamp:
+            self.refresh(stamp)
+        return self
+
+    def within(self, position, radius):
+        """Objects whose current position is within radius of position, in the order they were given."""
+        lo = bisect_left(self.positions, position - radius - self.slack)
+        hi = bisect_right(self.positions, position + radius + self.slack)
+        objects = self.objects
+        return [objects[i] for i in sorted(self.order[lo:hi]) if abs(objects[i].position - position) <= radius]
+
+    def nearest_distance(self, position, exclude=None):
+        """Distance from position to the closest object other than exclude, or None if there is none."""
+        objects, order, positions = self.objects, self.order, self.positions
+        best = None
+        start = bisect_left(positions, position)
+        for j in range(start - 1, -1, -1):  # Walk left until nothing closer can follow
+            if best is not None and position - positions[j] - self.slack > best:
+                break
+            other = objects[order[j]]
+            if other is not exclude:
+                distance = abs(other.position - position)
+                best = distance if best is None else min(best, distance)
+        for j in range(start, len(order)):  # Then right
+            if best is not None and positions[j] - position - self.slack > best:
+                break
+            other = objects[order[j]]
+            if other is not exclude:
+                distance = abs(other.position - position)
+                best = distance if best is None else min(best, distance)
+        return best
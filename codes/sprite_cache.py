@@ -0,0 +1,37 @@
+from collections import OrderedDict
+import pygame
+
+class SpriteCache:
+    """Prebuilt rotated vehicle sprites keyed by quantized angle, size and color.
+
+    Rotating and filling a new surface per vehicle per frame dominates the
+    frame time with many vehicles; here each (angle step, size, color) is
+    built once and reused. Angles are rounded to step degrees, and the least
+    recently used sprites are evicted above max_entries.
+    """
+
+    def __init__(self, step=1.0, max_entries=2048):
+        self.step = step
+        self.max_entries = max_entries
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, angle):
+        return round(angle / self.step) % round(360 / self.step)
+
+    def rotated(self, width, height, angle, color):
+        """Surface of a width x height vehicle rotated by angle degrees (counterclockwise), filled with color."""
+        key = (self.quantize(angle), width, height, color)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = pygame.transform.rotate(pygame.Surface((width, height)), key[0] * self.step)
+        sprite.fill(color)
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)
+        return sprite
@@ -0,0 +1,223 @@
+import math
+from bisect import bisect_right, insort
+
+DEFAULT_QUANTILES = (0.5, 0.99, 0.999)
+
+class RunningStats:
+    """Count, mean, variance, min and max in O(1) memory (Welford's algorithm)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Fold in the stats of another stream (Chan et al.), e.g. from another worker."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "mean": self.mean, "std": self.std, "min": self.min, "max": self.max}
+
+class P2Quantile:
+    """Streaming estimate of the p-quantile with five markers (the P-square algorithm of Jain and Chlamtac).
+
+    The first five values are kept exactly; after that the markers move
+    towards their desired positions with piecewise-parabolic steps.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+        self.count = 0
+
+    def add(self, x):
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1  # q[k] <= x < q[k + 1]
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self.parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])  # Linear step
+                q[i] = height
+                n[i] += d
+
+    def parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        if not self.count:
+            return math.nan
+        if self.count <= 5:
+            return self.heights[min(self.count - 1, int(round(self.p * (self.count - 1))))]
+        return self.heights[2]
+
+class WindowedRate:
+    """Events per second over the last window seconds of simulated time, in a ring of buckets."""
+
+    def __init__(self, window=1.0, buckets=10):
+        self.window = window
+        self.width = window / buckets
+        self.counts = [0] * buckets
+        self.latest = None  # Index of the newest bucket
+
+    def advance(self, bucket):
+        if self.latest is None:
+            self.latest = bucket
+        elif bucket > self.latest:
+            size = len(self.counts)
+            for b in range(self.latest + 1, min(bucket, self.latest + size) + 1):
+                self.counts[b % size] = 0
+            self.latest = bucket
+
+    def add(self, now, count=1):
+        bucket = int(now // self.width)
+        self.advance(bucket)
+        if bucket > self.latest - len(self.counts):  # Older events have left the window
+            self.counts[bucket % len(self.counts)] += count
+
+    def rate(self, now=None):
+        if now is not None:
+            self.advance(int(now // self.width))
+        return sum(self.counts) / self.window
+
+class Metric:
+    """Running stats, streaming quantiles and (with a window) the rate of one measured quantity."""
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES, window=1.0):
+        self.stats = RunningStats()
+        self.quantiles = [P2Quantile(p) for p in quantiles]
+        self.rate = WindowedRate(window) if window else None
+
+    def add(self, value, now=None):
+        self.stats.add(value)
+        for quantile in self.quantiles:
+            quantile.add(value)
+        if now is not None and self.rate is not None:
+            self.rate.add(now)
+
+    def summary(self, now=None):
+        summary = self.stats.summary()
+        for quantile in self.quantiles:
+            summary[f"p{quantile.p * 100:g}"] = quantile.value
+        if self.rate is not None and self.rate.latest is not None:
+            summary["rate"] = self.rate.rate(now)
+        return summary
+
+class MetricsRegistry:
+    """Streaming metrics of every protocol, broken down per vehicle and per link.
+
+    record(protocol, name, value, now, vehicle, link) updates the protocol's
+    Metric (stats, p50/p99/p99.9 and the rate of records over the last window
+    seconds when now is given) and, for the given vehicle and link (a
+    (sender, receiver) pair), a RunningStats. Metrics created with
+    quantiles=False (success flags, reliabilities) skip the quantile markers,
+    which are most of the cost of a record. Every accumulator has constant
+    size, so memory depends on the number of vehicles and links, not on the
+    run length.
+    """
+
+    def __init__(self, quantiles=DEFAULT_QUANTILES, window=1.0):
+        self.quantiles = quantiles
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.protocols = {}  # protocol -> {name: Metric}
+        self.vehicles = {}  # (protocol, vehicle) -> {name: RunningStats}
+        self.links = {}  # (protocol, sender, receiver) -> {name: RunningStats}
+
+    def metric(self, protocol, name, quantiles=True):
+        metrics = self.protocols.setdefault(protocol, {})
+        metric = metrics.get(name)
+        if metric is None:
+            metric = metrics[name] = Metric(self.quantiles if quantiles else (), self.window)
+        return metric
+
+    def record(self, protocol, name, value, now=None, vehicle=None, link=None, quantiles=True):
+        self.metric(protocol, name, quantiles).add(value, now)
+        if vehicle is not None:
+            self.stats(self.vehicles, (protocol, vehicle), name).add(value)
+        if link is not None:
+            self.stats(self.links, (protocol,) + tuple(link), name).add(value)
+
+    @staticmethod
+    def stats(table, key, name):
+        metrics = table.setdefault(key, {})
+        stats = metrics.get(name)
+        if stats is None:
+            stats = metrics[name] = RunningStats()
+        return stats
+
+    def summary(self, protocol=None, per_vehicle=False, per_link=False, now=None):
+        """Nested dict of the metrics (of one protocol, or all), JSON-ready."""
+        summary = {}
+        for name, metrics in self.protocols.items():
+            if protocol is None or name == protocol:
+                summary[name] = {"metrics": {m: metric.summary(now) for m, metric in metrics.items()}}
+        if per_vehicle:
+            for (name, vehicle), metrics in self.vehicles.items():
+                if name in summary:
+                    summary[name].setdefault("vehicles", {})[str(vehicle)] = {m: s.summary() for m, s in metrics.items()}
+        if per_link:
+            for (name, sender, receiver), metrics in self.links.items():
+                if name in summary:
+                    summary[name].setdefault("links", {})[f"{sender}->{receiver}"] = {m: s.summary() for m, s in metrics.items()}
+        return summary
+
+METRICS = MetricsRegistry()  # Shared by the scripts of one process
@@ -0,0 +1,31 @@
+class TickScheduler:
+    """Time-stepped alternative to one SimPy process per agent.
+
+    With a process per agent, every agent costs a heap event and a generator
+    resume per tick. Here a single process calls step(agent) for every agent
+    of every group once per tick and then waits one tick, so the event queue
+    holds one entry whatever the number of agents. Groups run in the order
+    they were added and agents in list order, which is the order SimPy
+    resumes same-time processes created in that order, so both schedulers
+    give the same results. Agents can still start their own processes for
+    truly asynchronous events.
+    """
+
+    def __init__(self, env, tick=1):
+        self.env = env
+        self.tick = tick
+        self.groups = []  # (agents, step) in calling order
+        self.ticks = 0
+        self.process = env.process(self.run())
+
+    def add(self, agents, step):
+        """Call step(agent) for each of agents (a live list) every tick, after the groups added before."""
+        self.groups.append((agents, step))
+
+    def run(self):
+        while True:
+            for agents, step in self.groups:
+                for agent in agents:
+                    step(agent)
+            self.ticks += 1
+            yield self.env.timeout(self.tick)
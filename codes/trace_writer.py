@@ -0,0 +1,163 @@
+import math
+import os
+import struct
+import numpy as np
+
+MAGIC = b"VTRACE1\n"
+
+# Column name -> dtype of the per-vehicle trace
+FIELDS = (
+    ("step", "<i8"),
+    ("vehicle", "<i4"),
+    ("x", "<f8"),
+    ("y", "<f8"),
+    ("speed", "<f8"),
+    ("latency", "<f8"),
+    ("reliability", "<f8"),
+    ("network_efficiency", "<f8"),
+    ("distance_ahead", "<f8"),  # NaN for platoon leaders
+)
+
+class TraceWriter:
+    """Trace sink that replaces per-tick print statements.
+
+    Rows go into preallocated column buffers and are written to a binary
+    columnar file one block at a time: a row count followed by each column's
+    raw bytes. With path=None nothing is stored. Console output is an opt-in,
+    sampled view: sample(step) is True only every print_every steps. With
+    append=True an existing trace file is kept and new blocks go after it,
+    e.g. when a run resumes from a checkpoint (see offset and truncate).
+    """
+
+    def __init__(self, path=None, block_rows=65536, print_every=0, append=False):
+        self.path = path
+        self.block_rows = block_rows
+        self.print_every = print_every
+        self.rows = 0  # Rows waiting in the buffers
+        self.total_rows = 0
+        self.columns = {}
+        self.file = None
+        if path is not None:
+            self.columns = {name: np.empty(block_rows, dtype=dtype) for name, dtype in FIELDS}
+            if append and os.path.exists(path):
+                self.file = open(path, "r+b")
+                if self.file.read(len(MAGIC)) != MAGIC:
+                    self.file.close()
+                    raise ValueError(f"{path} is not a vehicle trace file")
+                self.file.seek(0, os.SEEK_END)
+            else:
+                self.file = open(path, "wb")
+                self.file.write(MAGIC)
+                self.file.write(struct.pack("<H", len(FIELDS)))
+                for name, dtype in FIELDS:
+                    for text in (name, dtype):
+                        encoded = text.encode()
+                        self.file.write(struct.pack("<B", len(encoded)) + encoded)
+
+    def sample(self, step):
+        """True if the console view should print this step."""
+        return self.print_every > 0 and step % self.print_every == 0
+
+    def record(self, step, vehicle, x, y, speed, latency, reliability, network_efficiency, distance_ahead=math.nan):
+        """Record one vehicle at one step."""
+        if self.file is None:
+            return
+        i = self.rows
+        columns = self.columns
+        columns["step"][i] = step
+        columns["vehicle"][i] = vehicle
+        columns["x"][i] = x
+        columns["y"][i] = y
+        columns["speed"][i] = speed
+        columns["latency"][i] = latency
+        columns["reliability"][i] = reliability
+        columns["network_efficiency"][i] = network_efficiency
+        columns["distance_ahead"][i] = distance_ahead
+        self.rows += 1
+        if self.rows == self.block_rows:
+            self.flush()
+
+    def record_many(self, step, **values):
+        """Record many vehicles at once from arrays (or scalars) keyed by column name."""
+        if self.file is None:
+            return
+        count = len(values["vehicle"])
+        start = 0
+        while start < count:
+            take = min(count - start, self.block_rows - self.rows)
+            rows = slice(self.rows, self.rows + take)
+            for name, _ in FIELDS:
+                if name == "step":
+                    self.columns[name][rows] = step
+                    continue
+                value = values.get(name, math.nan)
+                self.columns[name][rows] = value[start:start + take] if np.ndim(value) else value
+            self.rows += take
+            start += take
+            if self.rows == self.block_rows:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered rows as one block."""
+        if self.file is None or self.rows == 0:
+            return
+        self.file.write(struct.pack("<I", self.rows))
+        for name, _ in FIELDS:
+            self.file.write(self.columns[name][:self.rows].tobytes())
+        self.total_rows += self.rows
+        self.rows = 0
+
+    def offset(self):
+        """Flush to disk and return the end of the file, for a checkpoint to truncate back to (None without a file)."""
+        if self.file is None:
+            return None
+        self.flush()
+        self.file.flush()
+        os.fsync(self.file.fileno())  # The rows before a checkpoint must survive a crash after it
+        return self.file.tell()
+
+    def truncate(self, offset):
+        """Drop the buffered rows and everything written after offset, which came from offset()."""
+        if self.file is None or offset is None:
+            return
+        self.rows = 0
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_trace(path):
+    """Load a trace file into a dict of column arrays."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a vehicle trace file")
+        (count,) = struct.unpack("<H", f.read(2))
+        fields = []
+        for _ in range(count):
+            name = f.read(struct.unpack("<B", f.read(1))[0]).decode()
+            dtype = f.read(struct.unpack("<B", f.read(1))[0]).decode()
+            fields.append((name, np.dtype(dtype)))
+        blocks = {name: [] for name, _ in fields}
+        while True:
+            header = f.read(4)
+            if not header:
+                break
+            (rows,) = struct.unpack("<I", header)
+            for name, dtype in fields:
+                blocks[name].append(np.frombuffer(f.read(rows * dtype.itemsize), dtype=dtype))
+    return {name: np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+            for (name, dtype), parts in zip(fields, blocks.values())}
+
+def open_trace(options, append=False):
+    """Create the trace sink selected by the --trace and --print-every options."""
+    return TraceWriter(options.trace, print_every=options.print_every, append=append)
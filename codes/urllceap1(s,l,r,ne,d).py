@@ -1,6 +1,15 @@
 import pygame
-import time
 import random
+from headless import run_options, FrameLoop
+from sim_clock import SimClock
+from render_cache import LayeredRenderer
+from phase_profiler import PROFILER
+from authenticator import Authenticator
+
+# Parse --headless/--steps/--seed before the window is opened
+OPTIONS = run_options()
+FRAMES = FrameLoop(OPTIONS)
+CLOCK = SimClock(OPTIONS.real_time_factor)  # Paced to real time only in windowed runs
 
 # Initialize Pygame
 pygame.init()
@@ -23,18 +32,29 @@ vehicle_speed = 2
 
 # EAP Class for Authentication
 class EAP:
-    def __init__(self):
+    def __init__(self, authenticator=None):
         self.authenticated_vehicles = set()  # Set to track authenticated vehicles
+        # Handshake costs and session tickets; half of the handshakes fail, as in the original demo
+        self.authenticator = authenticator if authenticator is not None else Authenticator(success_probability=0.5)
 
     def authenticate(self, vehicle_id):
-        # Simulate EAP authentication (can be replaced with real authentication logic)
-        if random.choice([True, False]):
-            self.authenticated_vehicles.add(vehicle_id)
-            print(f"Vehicle {vehicle_id} authenticated successfully.")
-            return True
-        else:
-            print(f"Vehicle {vehicle_id} failed authentication.")
-            return False
+        return self.authenticate_batch([vehicle_id])[0]
+
+    def authenticate_batch(self, vehicle_ids):
+        # All join requests of a frame go to the authenticator together and are served concurrently
+        results = self.authenticator.authenticate_batch(vehicle_ids, CLOCK.now)
+        for result in results:
+            handshake = "resumed session" if result.resumed else "full handshake"
+            if result.success:
+                self.authenticated_vehicles.add(result.key)
+                print(f"Vehicle {result.key} authenticated successfully ({handshake}, {result.latency * 1000:.1f} ms).")
+            else:
+                print(f"Vehicle {result.key} failed authentication ({handshake}, {result.latency * 1000:.1f} ms).")
+        return [result.success for result in results]
+
+    def leave(self, vehicle_id):
+        # The vehicle keeps its session ticket, so joining again is a short resumption
+        self.authenticated_vehicles.discard(vehicle_id)
 
 # Vehicle class to handle movement and communication
 class Vehicle:
@@ -49,9 +69,11 @@ class Vehicle:
         self.y += self.speed  # Move the vehicle downward
         if self.y > height:
             self.y = -vehicle_height  # Reset vehicle position to top once it moves out of view
+            return True  # Re-entered the road
+        return False
 
     def draw(self):
-        pygame.draw.rect(window, blue, (self.x, self.y, vehicle_width, vehicle_height))
+        return pygame.draw.rect(window, blue, (self.x, self.y, vehicle_width, vehicle_height))
 
     def communicate(self, other_vehicle):
         if self.authenticated and other_vehicle.authenticated:
@@ -68,7 +90,7 @@ class Vehicle:
                 print(f"Vehicle {self.id} at ({self.x},{self.y}) is communicating with vehicle {other_vehicle.id} at ({other_vehicle.x},{other_vehicle.y})")
                 print(f"Distance to Vehicle {other_vehicle.id}: {distance_to_next_vehicle:.2f} meters")
                 print(f"Speed of Vehicle {self.id}: {self.speed} units/s, Latency: {latency:.2f} seconds, Reliability: {reliability:.2f}")
-                time.sleep(latency)  # Delay to simulate real-time transfer
+                CLOCK.send(latency)  # Latency advances simulated time
                 return True, reliability  # Communication successful
             else:
                 print(f"Vehicle {self.id} failed to communicate with vehicle {other_vehicle.id}. Reliability: {reliability:.2f}")
@@ -78,49 +100,66 @@ class Vehicle:
             return False, None
 
 # Define the road and vehicles
-def draw_road():
-    window.fill(black)
-    pygame.draw.rect(window, red, (0, 100, width, 10))  # Red line at top
-    pygame.draw.line(window, yellow, (width // 2, 0), (width // 2, height), 5)  # Yellow dashed line
+def draw_road(surface):
+    surface.fill(black)
+    pygame.draw.rect(surface, red, (0, 100, width, 10))  # Red line at top
+    pygame.draw.line(surface, yellow, (width // 2, 0), (width // 2, height), 5)  # Yellow dashed line
+
+RENDERER = LayeredRenderer(window, draw_road)  # The road is drawn once; only the vehicles are redrawn
 
 # URLLC Protocol Simulation
 def urllc_protocol(vehicles, eap):
     total_communications = 0
     successful_communications = 0
 
-    while True:
+    while FRAMES.running():
         # Check for Pygame quit event
-        for event in pygame.event.get():
+        for event in FRAMES.events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
         
         # Update vehicle positions and simulate communication
-        draw_road()
+        if FRAMES.render:
+            with PROFILER.phase("draw"):
+                RENDERER.begin_frame()
         
-        # Authenticate vehicles
-        for vehicle in vehicles:
-            if not vehicle.authenticated:
-                vehicle.authenticated = eap.authenticate(vehicle.id)
+        # Authenticate the vehicles that are not yet authenticated, as one batch
+        with PROFILER.phase("authenticate"):
+            pending = [vehicle for vehicle in vehicles if not vehicle.authenticated]
+            if pending:
+                for vehicle, authenticated in zip(pending, eap.authenticate_batch([vehicle.id for vehicle in pending])):
+                    vehicle.authenticated = authenticated
 
         for i in range(len(vehicles)):
-            vehicles[i].move()  # Move each vehicle
-            vehicles[i].draw()  # Draw each vehicle
+            with PROFILER.phase("move"):
+                if vehicles[i].move():  # Move each vehicle; one that re-enters the road joins again
+                    vehicles[i].authenticated = False
+                    eap.leave(vehicles[i].id)
+            if FRAMES.render:
+                with PROFILER.phase("draw"):
+                    RENDERER.mark(vehicles[i].draw())  # Draw each vehicle
             
             # Simulate communication with the next vehicle
             if i < len(vehicles) - 1:
                 total_communications += 1
-                success, reliability = vehicles[i].communicate(vehicles[i + 1])
+                with PROFILER.phase("communicate"):
+                    success, reliability = vehicles[i].communicate(vehicles[i + 1])
                 if success:
                     successful_communications += 1
 
         # Calculate and print network efficiency and reliability
-        if total_communications > 0:
-            efficiency = (successful_communications / total_communications) * 100  # Efficiency in percentage
-            print(f"\nNetwork Efficiency: {efficiency:.2f}% (Total Communications: {total_communications}, Successful Communications: {successful_communications})")
-
-        pygame.display.update()
-        time.sleep(0.05)  # Frame rate control
+        with PROFILER.phase("print_info"):
+            if total_communications > 0:
+                efficiency = (successful_communications / total_communications) * 100  # Efficiency in percentage
+                print(f"\nNetwork Efficiency: {efficiency:.2f}% (Total Communications: {total_communications}, Successful Communications: {successful_communications})")
+
+        if FRAMES.render:
+            with PROFILER.phase("present"):
+                RENDERER.present()
+        CLOCK.advance(0.05)  # Frame rate control
+        FRAMES.tick()
+    pygame.quit()
 
 if __name__ == "__main__":  # Fixed main guard
     # Initialize EAP
@@ -132,3 +171,4 @@ if __name__ == "__main__":  # Fixed main guard
     ]
     
     urllc_protocol(vehicles, eap)
+    print(f"Authentication: {eap.authenticator.stats()}")